@@ -1,17 +1,21 @@
 import logging
-from typing import Optional
+from functools import lru_cache
+from typing import Final, List, Optional
 
-from agents import Agent, RunConfig, Runner
+from agents import Agent, ModelSettings, RunConfig, Runner, set_default_openai_client
 
-from config.settings import settings
-from tools.plant_diagnosis import diagnose_plant_photo, identify_plant_species
+from config.settings import get_settings
+from services.openai_client import get_openai_client
+from tools.plant_diagnosis import diagnose_plant_photo, diagnose_plant_photos, identify_plant_species
 from tools.care_recommendations import (
     generate_care_instructions,
+    generate_full_care_plan,
     recommend_fertilizers,
     recommend_tools,
 )
 from tools.plant_encyclopedia import (
     get_plant_encyclopedia,
+    get_plant_encyclopedia_batch,
     calculate_watering_schedule,
 )
 from tools.user_management import (
@@ -19,50 +23,75 @@ from tools.user_management import (
     get_user_plant_history,
     schedule_reminder,
 )
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+# Инструкции и схемы инструментов уходят в начале каждого запроса к модели.
+# Они должны оставаться побайтно одинаковыми между вызовами (никакой подстановки
+# данных пользователя, фиксированный порядок инструментов), чтобы OpenAI
+# переиспользовал закешированный префикс промпта.
 
-logger = logging.getLogger(__name__)
+# Системное описание бота (на русском)
+SYSTEM_PROMPT: Final[str] = (
+    "Ты — PlantMama AI, виртуальный помощник по уходу за растениями. "
+    "Отвечай на все вопросы пользователя на русском языке.\n"
+    "1. Если в сообщении есть изображение растения, вызови identify_plant_species и diagnose_plant_photo "
+    "одновременно, в одном шаге: они независимы и оба берут фото из контекста. "
+    "Если фото несколько, вместо diagnose_plant_photo вызови diagnose_plant_photos один раз. "
+    "Справку get_plant_encyclopedia запрашивай уже по определённому виду; "
+    "для нескольких растений сразу используй get_plant_encyclopedia_batch.\n"
+    "2. Если нужен полный план ухода (уход, удобрения и инструменты), используй generate_full_care_plan; "
+    "для отдельных рекомендаций используй generate_care_instructions, recommend_fertilizers, recommend_tools.\n"
+    "3. Если необходимо сохранить или получить историю пользователя, используй save_user_session или get_user_plant_history.\n"
+    "4. Если нужно поставить напоминание, используй schedule_reminder.\n"
+    "5. В каждом ответе стремись быть максимально понятным и полезным, не выходя за рамки упомянутых инструментов."
+)
+
+# Все доступные инструменты агента
+TOOLS: Final[tuple] = (
+    diagnose_plant_photo,
+    diagnose_plant_photos,
+    identify_plant_species,
+    generate_care_instructions,
+    recommend_fertilizers,
+    recommend_tools,
+    generate_full_care_plan,
+    get_plant_encyclopedia,
+    get_plant_encyclopedia_batch,
+    calculate_watering_schedule,
+    save_user_session,
+    get_user_plant_history,
+    schedule_reminder,
+)
+
+# Несколько вызовов инструментов из одного ответа модели Runner выполняет параллельно,
+# поэтому определение вида и диагностика идут за время самого долгого из них
+AGENT_MODEL_SETTINGS: Final[ModelSettings] = ModelSettings(parallel_tool_calls=True)
+
+# RunConfig только читается Runner'ом, поэтому один экземпляр на все вызовы
+DEFAULT_RUN_CONFIG: Final[RunConfig] = RunConfig()
+
+FALLBACK_REPLY: Final[str] = "Извините, я не смог обработать ваш запрос."
 
 
 class PlantCareAgent:
+    __slots__ = ("agent", "client", "system_prompt")
+
     def __init__(self):
-                # Системное описание бота (на русском)
-        self.system_prompt = (
-            "Ты — PlantMama AI, виртуальный помощник по уходу за растениями. "
-            "Отвечай на все вопросы пользователя на русском языке.\n"
-            "1. Если в сообщении есть изображение растения, сначала определи вид с помощью инструмента identify_plant_species, "
-            "а затем проведи диагностику с помощью инструмента diagnose_plant_photo.\n"
-            "2. Если нужно дать общие рекомендации по уходу, используй инструменты generate_care_instructions, recommend_fertilizers, recommend_tools.\n"
-            "3. Если необходимо сохранить или получить историю пользователя, используй save_user_session или get_user_plant_history.\n"
-            "4. Если нужно поставить напоминание, используй schedule_reminder.\n"
-            "5. В каждом ответе стремись быть максимально понятным и полезным, не выходя за рамки упомянутых инструментов."
-        )
+        settings = get_settings()
+        self.system_prompt = SYSTEM_PROMPT
 
-        # Регистрируем все доступные инструменты
-        tools = [
-            diagnose_plant_photo,
-            identify_plant_species,
-            generate_care_instructions,
-            recommend_fertilizers,
-            recommend_tools,
-            get_plant_encyclopedia,
-            calculate_watering_schedule,
-            save_user_session,
-            get_user_plant_history,
-            schedule_reminder,
-        ]
+        # Общий AsyncOpenAI-клиент: Runner использует тот же пул соединений
+        self.client = get_openai_client()
+        set_default_openai_client(self.client)
 
         # Создаём агента, передавая в него наш AsyncOpenAI
         self.agent = Agent(
             name="PlantCare Agent",
-            model="gpt-4.1-mini",
+            model=settings.OPENAI_MODEL,
             instructions=self.system_prompt,
-            tools=tools,
+            tools=list(TOOLS),
+            model_settings=AGENT_MODEL_SETTINGS,
         )
 
     async def process_message(
@@ -70,48 +99,40 @@ class PlantCareAgent:
         user_id: str,
         message: str,
         image_data: Optional[bytes] = None,
+        images: Optional[List[bytes]] = None,
     ) -> str:
         """
         Основной метод: принимает ID пользователя, текстовое сообщение и (опционально) raw-данные изображения.
+        Несколько фото (альбом) передаются списком images, они уходят в diagnose_plant_photos.
         Возвращает ответ агента (текст).
         """
         try:
-            # Добавляем в контекст информацию о юзере
-            context = {"user_id": user_id}
-
-            # Если пользователь отправляет изображение, добавим флаг
-            if image_data:
-                context["has_image"] = True
+            # Контекст собираем одним литералом — без промежуточных мутаций
+            if images:
+                user_message = f"[ПОЛЬЗОВАТЕЛЬ ЗАГРУЗИЛ ИЗОБРАЖЕНИЯ: {len(images)}]"
+                context = {"user_id": user_id, "has_image": True, "image": images[0], "images": images}
+            elif image_data:
                 # Концентрируемся на том, что текстовое поле message останется пустым,
                 # а агент поймёт, что есть картинка.
                 user_message = "[ПОЛЬЗОВАТЕЛЬ ЗАГРУЗИЛ ИЗОБРАЖЕНИЕ]"
                 # Передадим картинку как дополнительный аргумент
-                response = await Runner.run(
-                    self.agent,
-                    input=user_message,
-                    context={"user_id": user_id, "image": image_data},
-                    run_config=RunConfig(),
-                )
+                context = {"user_id": user_id, "has_image": True, "image": image_data}
             else:
-                context["has_image"] = False
-                response = await Runner.run(
-                    self.agent,
-                    input=message,
-                    context=context,
-                    run_config=RunConfig(),
-                )
-
-            # Обычно .run возвращает объект с атрибутом .output — конечным текстовым ответом агента.
-            # Если вдруг .output отсутствует, попытаемся читать из .messages[-1].content
-            if hasattr(response, "output"):
-                return response.output
-            elif hasattr(response, "messages") and response.messages:
-                return response.messages[-1].content
-            else:
-                return "Извините, я не смог обработать ваш запрос."
+                user_message = message
+                context = {"user_id": user_id, "has_image": False}
+
+            response = await Runner.run(
+                self.agent,
+                input=user_message,
+                context=context,
+                run_config=DEFAULT_RUN_CONFIG,
+            )
+
+            # Runner.run возвращает RunResult, итоговый текст агента лежит в .final_output
+            return response.final_output or FALLBACK_REPLY
 
         except Exception as e:
-            logger.error(f"Ошибка в process_message: {e}", exc_info=True)
+            logger.error("Ошибка в process_message: %s", e, exc_info=True)
             return "Извините, произошла внутренняя ошибка при обработке вашего запроса. Попробуйте ещё раз."
 
     
@@ -141,3 +162,13 @@ class PlantCareAgent:
             user_id=user_id,
             image_data=image_data,
         )
+
+
+@lru_cache(maxsize=1)
+def get_agent() -> PlantCareAgent:
+    """Get the process-wide agent instance.
+
+    The agent holds no per-user state (it is passed via ``context`` on each
+    run), so a single instance is shared by all handlers.
+    """
+    return PlantCareAgent()
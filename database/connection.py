@@ -1,44 +1,90 @@
 """Database connection module."""
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
-
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.pool import NullPool
+from functools import lru_cache
+from typing import Any, AsyncGenerator
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
-from config.settings import settings
+from config.settings import get_settings
 from database.models import Base
 
 logger = logging.getLogger(__name__)
 
-# Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
-    pool_size=settings.DATABASE_POOL_SIZE,
-    max_overflow=settings.DATABASE_MAX_OVERFLOW,
-    pool_pre_ping=True,
-    echo=settings.DEBUG,
-)
 
-# Create async session factory
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+@lru_cache(maxsize=1)
+def get_engine() -> AsyncEngine:
+    """Create the async engine on first use so DB settings are only read when needed."""
+    settings = get_settings()
+    return create_async_engine(
+        settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        echo=settings.DEBUG,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Get the shared async session factory."""
+    return async_sessionmaker(
+        get_engine(),
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+
+def __getattr__(name: str) -> Any:
+    """Resolve the legacy ``engine`` / ``AsyncSessionLocal`` attributes lazily."""
+    if name == "engine":
+        return get_engine()
+    if name == "AsyncSessionLocal":
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 async def init_db() -> None:
     """Initialize database tables."""
-    async with engine.begin() as conn:
+    async with get_engine().begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     logger.info("Database initialized successfully")
 
 
+async def warmup_db_pool() -> None:
+    """
+    Open the pool's base connections ahead of the first requests.
+    
+    Connections are checked out concurrently so the pool really opens
+    DATABASE_POOL_SIZE of them; once returned they stay idle in the pool
+    until pool_recycle. Failures are logged, not raised: the pool still
+    connects lazily on demand.
+    """
+    async def _touch() -> None:
+        async with get_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    pool_size = get_settings().DATABASE_POOL_SIZE
+    results = await asyncio.gather(*(_touch() for _ in range(pool_size)), return_exceptions=True)
+    failures = [result for result in results if isinstance(result, BaseException)]
+    if failures:
+        logger.warning("Database pool warmup: %s of %s connections failed: %s", len(failures), pool_size, failures[0])
+    else:
+        logger.info("Database pool warmed up with %s connections", pool_size)
+
+
 async def close_db() -> None:
     """Close database connections."""
-    await engine.dispose()
+    await get_engine().dispose()
     logger.info("Database connections closed")
 
 
@@ -50,7 +96,7 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
     Yields:
         AsyncSession: Database session
     """
-    async with AsyncSessionLocal() as session:
+    async with get_session_factory()() as session:
         try:
             yield session
             await session.commit()
@@ -81,5 +127,5 @@ class DatabaseManager:
                 await session.execute("SELECT 1")
             return True
         except Exception as e:
-            logger.error(f"Database health check failed: {e}")
+            logger.error("Database health check failed: %s", e)
             return False
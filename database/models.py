@@ -1,10 +1,10 @@
 """Database models."""
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from sqlalchemy import (
-    Column,
+    CheckConstraint,
     Integer,
     String,
     DateTime,
@@ -12,135 +12,157 @@ from sqlalchemy import (
     Boolean,
     Text,
     ForeignKey,
-    JSON,
+    Index,
+    desc,
 )
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy.sql import func
 
-Base = declarative_base()
+
+class Base(DeclarativeBase):
+    """Declarative base for all models."""
 
 
 class User(Base):
     """User model."""
-    
+
     __tablename__ = "users"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    telegram_id = Column(String(50), unique=True, index=True)
-    username = Column(String(100), nullable=True)
-    first_name = Column(String(100), nullable=True)
-    last_name = Column(String(100), nullable=True)
-    language_code = Column(String(10), default="en")
-    preferences = Column(JSON, default={})
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    is_active = Column(Boolean, default=True)
-    
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    telegram_id: Mapped[Optional[str]] = mapped_column(String(50), unique=True, index=True)
+    username: Mapped[Optional[str]] = mapped_column(String(100))
+    first_name: Mapped[Optional[str]] = mapped_column(String(100))
+    last_name: Mapped[Optional[str]] = mapped_column(String(100))
+    language_code: Mapped[Optional[str]] = mapped_column(String(10), default="en")
+    preferences: Mapped[Optional[dict]] = mapped_column(JSONB, default=dict)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+    is_active: Mapped[Optional[bool]] = mapped_column(Boolean, default=True)
+
     # Relationships
-    plants = relationship("Plant", back_populates="user", cascade="all, delete-orphan")
-    sessions = relationship("Session", back_populates="user", cascade="all, delete-orphan")
-    reminders = relationship("Reminder", back_populates="user", cascade="all, delete-orphan")
+    plants: Mapped[List["Plant"]] = relationship(back_populates="user", cascade="all, delete-orphan")
+    sessions: Mapped[List["Session"]] = relationship(back_populates="user", cascade="all, delete-orphan")
+    reminders: Mapped[List["Reminder"]] = relationship(back_populates="user", cascade="all, delete-orphan")
 
 
 class Plant(Base):
     """Plant model."""
-    
+
     __tablename__ = "plants"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    name = Column(String(100), nullable=False)
-    species = Column(String(200), nullable=True)
-    scientific_name = Column(String(200), nullable=True)
-    nickname = Column(String(100), nullable=True)
-    photo_url = Column(String(500), nullable=True)
-    location = Column(String(100), nullable=True)
-    pot_size = Column(String(50), nullable=True)
-    soil_type = Column(String(100), nullable=True)
-    last_watered = Column(DateTime, nullable=True)
-    last_fertilized = Column(DateTime, nullable=True)
-    health_score = Column(Float, nullable=True)
-    notes = Column(Text, nullable=True)
-    added_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
+    name: Mapped[str] = mapped_column(String(100))
+    species: Mapped[Optional[str]] = mapped_column(String(200))
+    scientific_name: Mapped[Optional[str]] = mapped_column(String(200))
+    nickname: Mapped[Optional[str]] = mapped_column(String(100))
+    photo_url: Mapped[Optional[str]] = mapped_column(String(256))
+    location: Mapped[Optional[str]] = mapped_column(String(100))
+    pot_size: Mapped[Optional[str]] = mapped_column(String(50))
+    soil_type: Mapped[Optional[str]] = mapped_column(String(100))
+    last_watered: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    last_fertilized: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    health_score: Mapped[Optional[float]] = mapped_column(Float)
+    notes: Mapped[Optional[str]] = mapped_column(Text)
+    added_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
     # Relationships
-    user = relationship("User", back_populates="plants")
-    diagnoses = relationship("Diagnosis", back_populates="plant", cascade="all, delete-orphan")
-    reminders = relationship("Reminder", back_populates="plant", cascade="all, delete-orphan")
+    user: Mapped["User"] = relationship(back_populates="plants")
+    diagnoses: Mapped[List["Diagnosis"]] = relationship(back_populates="plant", cascade="all, delete-orphan")
+    reminders: Mapped[List["Reminder"]] = relationship(back_populates="plant", cascade="all, delete-orphan")
 
 
 class Session(Base):
     """Session model."""
-    
+
     __tablename__ = "sessions"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    start_time = Column(DateTime, default=datetime.utcnow)
-    end_time = Column(DateTime, nullable=True)
-    messages_count = Column(Integer, default=0)
-    tokens_used = Column(Integer, default=0)
-    
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
+    start_time: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    end_time: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    messages_count: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    tokens_used: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+
     # Relationships
-    user = relationship("User", back_populates="sessions")
-    messages = relationship("Message", back_populates="session", cascade="all, delete-orphan")
+    user: Mapped["User"] = relationship(back_populates="sessions")
+    messages: Mapped[List["Message"]] = relationship(back_populates="session", cascade="all, delete-orphan")
 
 
 class Message(Base):
     """Message model."""
-    
+
     __tablename__ = "messages"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False)
-    role = Column(String(20), nullable=False)  # user, assistant, system
-    content = Column(Text, nullable=False)
-    has_image = Column(Boolean, default=False)
-    image_url = Column(String(500), nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    tokens_used = Column(Integer, default=0)
-    
+    __table_args__ = (
+        Index("ix_messages_session_ts", "session_id", "timestamp"),
+        CheckConstraint("role IN ('user', 'assistant', 'system')", name="ck_message_role"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    session_id: Mapped[int] = mapped_column(Integer, ForeignKey("sessions.id"))
+    role: Mapped[str] = mapped_column(String(16))  # user, assistant, system
+    content: Mapped[str] = mapped_column(Text)
+    has_image: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    image_url: Mapped[Optional[str]] = mapped_column(String(256))
+    timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    tokens_used: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+
     # Relationships
-    session = relationship("Session", back_populates="messages")
+    session: Mapped["Session"] = relationship(back_populates="messages")
 
 
 class Diagnosis(Base):
     """Diagnosis model."""
-    
+
     __tablename__ = "diagnoses"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    plant_id = Column(Integer, ForeignKey("plants.id"), nullable=False)
-    image_url = Column(String(500), nullable=True)
-    health_score = Column(Float, nullable=False)
-    issues = Column(JSON, default=[])
-    severity = Column(String(20), nullable=False)  # mild, moderate, severe
-    recommendations = Column(JSON, default=[])
-    confidence = Column(Float, nullable=False)
-    notes = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
+    __table_args__ = (
+        # DESC matches the "latest diagnosis per plant" ORDER BY plant_id, created_at DESC
+        Index("ix_diagnoses_plant_created_desc", "plant_id", desc("created_at")),
+        Index("ix_diagnoses_issues_gin", "issues", postgresql_using="gin"),
+        CheckConstraint("severity IN ('mild', 'moderate', 'severe')", name="ck_diagnosis_severity"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    plant_id: Mapped[int] = mapped_column(Integer, ForeignKey("plants.id"))
+    image_url: Mapped[Optional[str]] = mapped_column(String(256))
+    health_score: Mapped[float] = mapped_column(Float)
+    issues: Mapped[Optional[list]] = mapped_column(JSONB, default=list)
+    severity: Mapped[str] = mapped_column(String(16))  # mild, moderate, severe
+    recommendations: Mapped[Optional[list]] = mapped_column(JSONB, default=list)
+    confidence: Mapped[float] = mapped_column(Float)
+    notes: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
     # Relationships
-    plant = relationship("Plant", back_populates="diagnoses")
+    plant: Mapped["Plant"] = relationship(back_populates="diagnoses")
 
 
 class Reminder(Base):
     """Reminder model."""
-    
+
     __tablename__ = "reminders"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    plant_id = Column(Integer, ForeignKey("plants.id"), nullable=True)
-    type = Column(String(50), nullable=False)  # watering, fertilizing, pruning, etc.
-    title = Column(String(200), nullable=False)
-    description = Column(Text, nullable=True)
-    scheduled_at = Column(DateTime, nullable=False)
-    sent_at = Column(DateTime, nullable=True)
-    status = Column(String(20), default="pending")  # pending, sent, cancelled
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
+    __table_args__ = (
+        Index("ix_reminders_user_status_sched", "user_id", "status", "scheduled_at"),
+        CheckConstraint("status IN ('pending', 'sent', 'cancelled')", name="ck_reminder_status"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
+    plant_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("plants.id"))
+    type: Mapped[str] = mapped_column(String(32))  # watering, fertilizing, pruning, etc.
+    title: Mapped[str] = mapped_column(String(200))
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    scheduled_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    status: Mapped[Optional[str]] = mapped_column(String(16), default="pending")  # pending, sent, cancelled
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
     # Relationships
-    user = relationship("User", back_populates="reminders")
-    plant = relationship("Plant", back_populates="reminders")
+    user: Mapped["User"] = relationship(back_populates="reminders")
+    plant: Mapped[Optional["Plant"]] = relationship(back_populates="reminders")
@@ -20,9 +20,12 @@ from telegram.ext import (
     filters,
 )
 
-from config.settings import settings
+from config.settings import get_settings
 from core.agent import PlantCareAgent
-from services.image_processing import ImageProcessor
+from database.connection import close_db, warmup_db_pool
+from services.cache import close_redis
+from services.image_processing import ImageProcessor, shutdown_image_pool
+from services.openai_client import close_openai_client
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +41,7 @@ class TelegramBot:
             agent: PlantCare agent instance
         """
         self.agent = agent
-        self.token = settings.TELEGRAM_BOT_TOKEN
+        self.token = get_settings().TELEGRAM_BOT_TOKEN
         self.application: Optional[Application] = None
         
     async def start(self) -> None:
@@ -52,6 +55,9 @@ class TelegramBot:
         # Set bot commands
         await self._set_bot_commands()
         
+        # Open DB connections before the first user message needs one
+        await warmup_db_pool()
+        
         # Start polling
         await self.application.run_polling()
 
@@ -63,6 +69,10 @@ class TelegramBot:
             await self.application.stop()
             await self.application.shutdown()
 
+        await close_openai_client()
+        await close_redis()
+        await close_db()
+        shutdown_image_pool()
         logger.info("Telegram bot stopped")
 
     def _register_handlers(self) -> None:
@@ -189,7 +199,7 @@ class TelegramBot:
             )
 
         except Exception as e:
-            logger.error(f"Error processing voice message: {e}")
+            logger.error("Error processing voice message: %s", e)
             await update.message.reply_text(
                 "Произошла ошибка при обработке голосового сообщения. Попробуйте еще раз."
             )
@@ -396,7 +406,7 @@ class TelegramBot:
             )
             
         except Exception as e:
-            logger.error(f"Error handling photo: {e}", exc_info=True)
+            logger.error("Error handling photo: %s", e, exc_info=True)
             await update.message.reply_text(
                 "😔 Произошла ошибка при обработке фотографии.\n"
                 "Пожалуйста, попробуйте еще раз или обратитесь в поддержку."
@@ -1,21 +1,31 @@
 import logging
 import asyncio
-from config.settings import settings
-from core.agent import PlantCareAgent
+from config.settings import get_settings
+from core.agent import get_agent
 from handlers.telegram_handler import TelegramBot
 from utils.logging_config import setup_logging
 
+try:
+    import uvloop
+except ImportError:  # uvloop is optional (no Windows support); fall back to the stdlib loop
+    uvloop = None
+
 
 def main() -> None:
     """Start the PlantCare Agent application."""
-    setup_logging(settings.LOG_LEVEL)
+    setup_logging(get_settings().LOG_LEVEL)
     logger = logging.getLogger(__name__)
 
     logger.info("Starting PlantCare Agent...")
 
+    # Every loop created from here on (bot polling, tool fan-out) runs on uvloop
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop %s event loop", uvloop.__version__)
+
     try:
         # Initialize agent
-        agent = PlantCareAgent()
+        agent = get_agent()
 
         # Initialize Telegram bot
         bot = TelegramBot(agent)
@@ -26,7 +36,7 @@ def main() -> None:
     except KeyboardInterrupt:
         logger.info("Shutting down...")
     except Exception as e:
-        logger.error(f"Fatal error: {e}", exc_info=True)
+        logger.error("Fatal error: %s", e, exc_info=True)
         raise
 
 
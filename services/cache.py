@@ -0,0 +1,78 @@
+"""Redis cache service."""
+
+import logging
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+_REDIS: Optional[Redis] = None
+
+
+def get_redis() -> Optional[Redis]:
+    """
+    Get the shared Redis client.
+
+    Returns:
+        Redis client, or None if REDIS_URL is not configured
+    """
+    global _REDIS
+    if _REDIS is None:
+        redis_url = get_settings().REDIS_URL
+        if not redis_url:
+            return None
+        _REDIS = Redis.from_url(redis_url, decode_responses=True)
+    return _REDIS
+
+
+async def cache_get(key: str) -> Optional[str]:
+    """
+    Read a cached value.
+
+    Cache failures are logged and treated as a miss.
+
+    Args:
+        key: Cache key
+
+    Returns:
+        Cached string or None
+    """
+    redis = get_redis()
+    if redis is None:
+        return None
+    try:
+        return await redis.get(key)
+    except RedisError as e:
+        logger.warning("Cache read failed for %s: %s", key, e)
+        return None
+
+
+async def cache_set(key: str, value: str, ttl: int) -> None:
+    """
+    Store a value in the cache.
+
+    Args:
+        key: Cache key
+        value: String value to store
+        ttl: Time to live in seconds
+    """
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.setex(key, ttl, value)
+    except RedisError as e:
+        logger.warning("Cache write failed for %s: %s", key, e)
+
+
+async def close_redis() -> None:
+    """Close the shared Redis client."""
+    global _REDIS
+    if _REDIS is not None:
+        await _REDIS.aclose()
+        _REDIS = None
+        logger.info("Redis connection closed")
@@ -1,19 +1,191 @@
 """Image processing service."""
 
+import asyncio
 import io
+import json
 import logging
-import hashlib
-from typing import Tuple, Optional
+import multiprocessing
+import operator
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Tuple, Optional, TypeVar
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
 
-from PIL import Image, ImageOps, ImageEnhance
+import PIL
+from PIL import Image, ImageOps, ImageEnhance, ImageStat
+import blake3
 import numpy as np
 
-from config.settings import settings
+try:
+    from numba import njit, prange, set_num_threads
+except ImportError:  # numba is optional; fall back to the NumPy kernels
+    njit = None
+    set_num_threads = None
+
+try:
+    import cupy as cp
+except ImportError:  # cupy is optional; only used with USE_GPU_FEATURES
+    cp = None
+
+from config.settings import get_settings
+from services.cache import cache_get, cache_set
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Pillow-SIMD builds carry a ".postN" version suffix
+if ".post" in PIL.__version__:
+    logger.info("Using Pillow-SIMD %s", PIL.__version__)
+else:
+    logger.info("Using stock Pillow %s; install pillow-simd for faster resize/enhance", PIL.__version__)
+
+# Validation results by image hash, most recently used last
+_VALIDATION_CACHE: "OrderedDict[str, Tuple[bool, Optional[str]]]" = OrderedDict()
+
+# Processed (bytes, metadata) by image hash, most recently used last
+_PROCESSED_CACHE: "OrderedDict[str, Tuple[bytes, dict]]" = OrderedDict()
+
+# Worker processes for the CPU-bound decode/enhance/encode/feature work
+_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _init_worker() -> None:
+    """Keep Numba single-threaded inside each pool worker."""
+    # The pool already runs one worker per core; parallel Numba kernels in
+    # every worker would oversubscribe the CPU with cpu_count^2 threads.
+    if set_num_threads is not None:
+        set_num_threads(1)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Get the shared image worker pool, creating it on first use."""
+    global _POOL
+    if _POOL is None:
+        # Forking a process that runs an event loop (and possibly Numba's
+        # thread pool) can deadlock the children, so start workers fresh.
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _POOL = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+        )
+    return _POOL
+
+
+async def _run_in_pool(func: Callable[..., T], *args: Any) -> T:
+    """
+    Run a blocking image function in the worker pool without blocking the loop.
+    
+    A pool whose worker died (crash, OOM kill) rejects every later job, so it
+    is replaced with a fresh one and the job is retried once.
+    """
+    global _POOL
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    try:
+        return await loop.run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        logger.warning("Image worker pool is broken, restarting it")
+        if _POOL is pool:
+            _POOL = None
+            pool.shutdown(wait=False, cancel_futures=True)
+        return await loop.run_in_executor(_get_pool(), func, *args)
+
+
+def shutdown_image_pool() -> None:
+    """Shut down the image worker pool."""
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=True, cancel_futures=True)
+        _POOL = None
+        logger.info("Image worker pool shut down")
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True, fastmath=True)
+    def _features_kernel(arr):
+        """Accumulate the expensive scalar feature statistics in one pass over the pixels."""
+        height, width = arr.shape[0], arr.shape[1]
+        brown_count = 0
+        edges = 0
+        texture = 0
+        for i in prange(height):
+            # Sobel neighbours clamp at the border (scipy's mode="nearest")
+            up = max(i - 1, 0)
+            down = min(i + 1, height - 1)
+            for j in range(width):
+                r = np.int32(arr[i, j, 0])
+                g = np.int32(arr[i, j, 1])
+                b = np.int32(arr[i, j, 2])
+                if r > g > b and 50 < r < 180 and 30 < g < 140:
+                    brown_count += 1
+                if i > 0:
+                    edges += abs(g - np.int32(arr[i - 1, j, 1]))
+                
+                # |Gx| + |Gy| of the 3x3 Sobel on the green channel
+                left = max(j - 1, 0)
+                right = min(j + 1, width - 1)
+                g_ul = np.int32(arr[up, left, 1])
+                g_u = np.int32(arr[up, j, 1])
+                g_ur = np.int32(arr[up, right, 1])
+                g_l = np.int32(arr[i, left, 1])
+                g_r = np.int32(arr[i, right, 1])
+                g_dl = np.int32(arr[down, left, 1])
+                g_d = np.int32(arr[down, j, 1])
+                g_dr = np.int32(arr[down, right, 1])
+                grad_x = (g_dl + 2 * g_d + g_dr) - (g_ul + 2 * g_u + g_ur)
+                grad_y = (g_ur + 2 * g_r + g_dr) - (g_ul + 2 * g_l + g_dl)
+                texture += abs(grad_x) + abs(grad_y)
+        return brown_count, edges, texture, height * width
+else:
+    _features_kernel = None
+
+
+@lru_cache(maxsize=1)
+def _gpu_features_enabled() -> bool:
+    """Check once whether dominant colors should be computed on the GPU."""
+    if not get_settings().USE_GPU_FEATURES or cp is None:
+        return False
+    try:
+        return cp.cuda.is_available()
+    except Exception as e:
+        logger.warning("CUDA unavailable, using CPU features: %s", e)
+        return False
+
+
+def _top_colors_gpu(pixels: np.ndarray, n_colors: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Histogram packed color keys on the GPU and return the top-k keys and counts."""
+    q = (cp.asarray(pixels) >> 2).astype(cp.uint32)
+    keys = (q[:, 0] << 12) | (q[:, 1] << 6) | q[:, 2]
+    counts = cp.bincount(keys, minlength=1 << 18)
+    
+    top = _top_k_keys(counts, n_colors, cp)
+    return cp.asnumpy(top), cp.asnumpy(counts[top])
+
+
+def _top_k_keys(counts, n_colors: int, xp=np):
+    """
+    Return the n_colors most frequent histogram bins, ties broken by key.
+    
+    argpartition finds the k-th largest count in linear time, so only the k
+    winners are sorted instead of the whole histogram. Bins tied with the
+    k-th count are taken in key order, so NumPy and CuPy (``xp``) return the
+    same colors in the same order.
+    """
+    n_colors = min(n_colors, counts.size)
+    top = xp.argpartition(-counts, n_colors - 1)[:n_colors]
+    threshold = counts[top].min()
+    above = xp.flatnonzero(counts > threshold)
+    tied = xp.flatnonzero(counts == threshold)[: n_colors - above.size]
+    candidates = xp.concatenate((above, tied))
+    order = xp.lexsort(xp.stack((candidates, -counts[candidates])))
+    return candidates[order]
+
 
 class ImageProcessor:
     """Service for processing plant images."""
@@ -21,6 +193,27 @@ class ImageProcessor:
     MAX_SIZE = (1024, 1024)  # Maximum image dimensions
     ALLOWED_FORMATS = {"JPEG", "PNG", "JPG", "WEBP"}
     MIN_SIZE = (100, 100)  # Minimum acceptable image size
+    ENHANCE_FACTOR = 1.1  # Contrast / color / sharpness boost
+    FEATURE_SIZE = 256  # Longest side used for feature statistics
+    VALIDATION_CACHE_SIZE = 1024  # Validation results kept in process
+    VALIDATION_CACHE_TTL = 7 * 24 * 3600  # Redis TTL for validation results (seconds)
+    VALIDATION_CACHE_PREFIX = "image:validation:"
+    PROCESSED_CACHE_SIZE = 64  # Processed JPEGs kept in process (~100-400 KB each)
+    
+    # Potential issues as (feature, comparison, threshold, message)
+    _ISSUE_RULES = (
+        # Too much brown (potential disease/dead areas)
+        ("brown_ratio", operator.gt, 0.3, "High brown color ratio - possible dead or diseased areas"),
+        # Low green ratio
+        ("green_ratio", operator.lt, 0.1, "Low green color ratio - may not be a healthy plant"),
+        # Brightness issues (mutually exclusive, so order is preserved)
+        ("brightness", operator.lt, 50, "Image too dark for accurate analysis"),
+        ("brightness", operator.gt, 220, "Image overexposed - details may be lost"),
+        # Contrast
+        ("contrast", operator.lt, 20, "Low contrast - image may be blurry or out of focus"),
+    )
+    # Values assumed for features that are missing
+    _ISSUE_DEFAULTS = {"brown_ratio": 0, "green_ratio": 0, "brightness": 128, "contrast": 50}
     
     @classmethod
     async def process_image(cls, image_data: bytes) -> Tuple[bytes, dict]:
@@ -36,6 +229,26 @@ class ImageProcessor:
         Raises:
             ValueError: If image is invalid
         """
+        image_hash = cls._image_hash(image_data)
+        cached = _PROCESSED_CACHE.get(image_hash)
+        if cached is not None:
+            _PROCESSED_CACHE.move_to_end(image_hash)
+            processed_data, metadata = cached
+            return processed_data, dict(metadata)
+        
+        processed_data, metadata = await _run_in_pool(cls._process_image_sync, image_data)
+        cls._remember_processed(image_hash, processed_data, metadata)
+        return processed_data, metadata
+    
+    @classmethod
+    def _process_image_sync(cls, image_data: bytes) -> Tuple[bytes, dict]:
+        """Blocking body of process_image, run in the worker pool (no pixels sent back)."""
+        _, processed_data, metadata = cls._render_image(image_data)
+        return processed_data, metadata
+    
+    @classmethod
+    def _render_image(cls, image_data: bytes) -> Tuple[Image.Image, bytes, dict]:
+        """Decode, enhance and re-encode an upload, returning the processed image too."""
         try:
             # Open image
             image = Image.open(io.BytesIO(image_data))
@@ -57,7 +270,7 @@ class ImageProcessor:
             }
             
             # Calculate hash for deduplication
-            metadata["hash"] = hashlib.md5(image_data).hexdigest()
+            metadata["hash"] = cls._image_hash(image_data)
             
             # Fix orientation using EXIF data
             image = ImageOps.exif_transpose(image)
@@ -76,38 +289,52 @@ class ImageProcessor:
                 metadata["resized"] = True
                 metadata["new_size"] = image.size
             
-            # Save processed image
+            # Save processed image (baseline, single Huffman pass - optimize=True
+            # roughly doubles encode time for a few percent of size)
             output = io.BytesIO()
-            image.save(output, format="JPEG", quality=85, optimize=True)
+            image.save(output, format="JPEG", quality=85, progressive=False, subsampling="4:2:0")
             processed_data = output.getvalue()
             
             metadata["processed_size"] = len(processed_data)
             metadata["compression_ratio"] = round(len(processed_data) / len(image_data), 2)
             
-            logger.info(f"Processed image: {metadata}")
-            return processed_data, metadata
+            logger.info("Processed image: %s", metadata)
+            return image, processed_data, metadata
             
         except Exception as e:
-            logger.error(f"Error processing image: {e}")
+            logger.error("Error processing image: %s", e)
             raise ValueError(f"Failed to process image: {str(e)}")
     
     @classmethod
     def _enhance_plant_image(cls, image: Image.Image) -> Image.Image:
         """Enhance image for better plant detection."""
-        # Slightly increase contrast
-        contrast = ImageEnhance.Contrast(image)
-        image = contrast.enhance(1.1)
-        
-        # Slightly increase color saturation
-        color = ImageEnhance.Color(image)
-        image = color.enhance(1.1)
+        # Slightly increase contrast and color saturation in one blend.
+        # ImageEnhance.Contrast(k) then ImageEnhance.Color(k) is
+        # out = k^2 * pixel + (1 - k^2) * (mean + k * lum) / (1 + k),
+        # so a single-channel LUT on the luminance plus one blend replaces
+        # two full-image blends and a second luminance conversion.
+        # process_image converts everything to RGB or L before this point.
+        factor = cls.ENHANCE_FACTOR
+        gray = image.convert("L") if image.mode == "RGB" else image
+        mean = ImageStat.Stat(gray).mean[0]
+        if image.mode == "RGB":
+            base = gray.point([round((mean + factor * v) / (1 + factor)) for v in range(256)])
+            image = Image.blend(base.convert("RGB"), image, factor * factor)
+        else:
+            # Grayscale has no saturation, so only the contrast LUT applies
+            image = image.point(cls._contrast_lut(mean, factor))
         
-        # Ensure good sharpness
+        # Ensure good sharpness (needs a 3x3 convolution, so stays in PIL)
         sharpness = ImageEnhance.Sharpness(image)
-        image = sharpness.enhance(1.1)
+        image = sharpness.enhance(factor)
         
         return image
     
+    @staticmethod
+    def _contrast_lut(mean: float, factor: float) -> list:
+        """Build the 256-entry lookup table for a contrast stretch around mean."""
+        return [min(255, max(0, round(mean + factor * (v - mean)))) for v in range(256)]
+    
     @classmethod
     async def extract_plant_features(cls, image_data: bytes) -> dict:
         """
@@ -119,36 +346,113 @@ class ImageProcessor:
         Returns:
             Dictionary of extracted features
         """
+        return await _run_in_pool(cls._extract_plant_features_sync, image_data)
+    
+    @classmethod
+    def _extract_plant_features_sync(cls, image_data: bytes) -> dict:
+        """Blocking body of extract_plant_features, run in the worker pool."""
         try:
             image = Image.open(io.BytesIO(image_data))
             
             # Convert to RGB for consistent analysis
             if image.mode != "RGB":
                 image = image.convert("RGB")
+        except Exception as e:
+            logger.error("Error extracting features: %s", e)
+            return {}
+        
+        return cls._extract_features_from_image(image)
+    
+    @classmethod
+    def _extract_features_from_image(cls, image: Image.Image) -> dict:
+        """Extract visual features from a decoded PIL image."""
+        try:
+            # All features are aggregate statistics, so compute them once
+            # on a small copy instead of the full-resolution image
+            image = cls._downsample_for_features(image)
             
-            # Convert to numpy array
-            img_array = np.array(image)
-            
-            # Extract features
-            features = {
-                "dominant_colors": cls._get_dominant_colors(img_array),
-                "brightness": float(np.mean(img_array)),
-                "contrast": float(np.std(img_array)),
-                "green_ratio": cls._calculate_green_ratio(img_array),
-                "brown_ratio": cls._calculate_brown_ratio(img_array),
-                "texture_complexity": cls._calculate_texture_complexity(img_array),
-                "leaf_edge_detection": cls._detect_leaf_edges(img_array),
-            }
-            
-            # Detect potential issues
-            features["potential_issues"] = cls._detect_visual_issues(features)
-            
-            return features
+            # Brightness/contrast come straight from the PIL buffer in C
+            return cls._pixel_features(image, cls._brightness_contrast(image))
             
         except Exception as e:
-            logger.error(f"Error extracting features: {e}")
+            logger.error("Error extracting features: %s", e)
             return {}
     
+    @classmethod
+    def _pixel_features(cls, image: Image.Image, stats: dict) -> dict:
+        """Add the pixel-level features of a downsampled image to its brightness/contrast."""
+        img_array = np.asarray(image)
+        channels = cls._split_channels(img_array)
+        features = dict(stats)
+        features["green_ratio"] = cls._calculate_green_ratio(channels)
+        features.update(cls._expensive_features(img_array, channels))
+        
+        # Detect potential issues
+        features["potential_issues"] = cls._detect_visual_issues(features)
+        
+        return features
+    
+    @classmethod
+    def _expensive_features(
+        cls,
+        img_array: np.ndarray,
+        channels: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+    ) -> dict:
+        """Dominant colors, brown ratio, texture and edges - only needed once the cheap gates pass."""
+        features = {"dominant_colors": cls._get_dominant_colors(img_array)}
+        if (
+            _features_kernel is not None
+            and img_array.ndim == 3
+            and img_array.shape[2] == 3
+            and img_array.dtype == np.uint8
+        ):
+            features.update(cls._fused_features(img_array))
+        else:
+            features.update({
+                "brown_ratio": cls._calculate_brown_ratio(channels),
+                "texture_complexity": cls._calculate_texture_complexity(img_array),
+                "leaf_edge_detection": cls._detect_leaf_edges(img_array),
+            })
+        return features
+    
+    @classmethod
+    def _downsample_for_features(cls, image: Image.Image) -> Image.Image:
+        """Shrink the image so the longest side is at most FEATURE_SIZE."""
+        width, height = image.size
+        longest = max(height, width)
+        if longest <= cls.FEATURE_SIZE:
+            return image
+        
+        scale = cls.FEATURE_SIZE / longest
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return image.resize(size, Image.Resampling.BILINEAR)
+    
+    @staticmethod
+    def _brightness_contrast(image: Image.Image) -> dict:
+        """Mean and standard deviation over all bands, same as np.mean/np.std."""
+        stat = ImageStat.Stat(image)
+        count = sum(stat.count)
+        mean = sum(stat.sum) / count
+        variance = max(0.0, sum(stat.sum2) / count - mean * mean)
+        return {"brightness": float(mean), "contrast": float(variance ** 0.5)}
+    
+    @classmethod
+    def _fused_features(cls, img_array: np.ndarray) -> dict:
+        """Compute the scalar features with the single-pass Numba kernel."""
+        brown, edges, texture, pixels = _features_kernel(np.ascontiguousarray(img_array))
+        height, width = img_array.shape[:2]
+        vertical_pairs = max(1, (height - 1) * width)
+        edge_strength = float(edges / vertical_pairs)
+        
+        return {
+            "brown_ratio": round(brown / pixels, 3),
+            "texture_complexity": round(texture / pixels, 2),
+            "leaf_edge_detection": {
+                "edge_strength": round(edge_strength, 2),
+                "has_clear_edges": edge_strength > 20,
+            },
+        }
+    
     @staticmethod
     def _get_dominant_colors(img_array: np.ndarray, n_colors: int = 5) -> list:
         """Get dominant colors from image using simple quantization."""
@@ -160,46 +464,60 @@ class ImageProcessor:
         
         # Simple color quantization
         # Reduce color space to 6 bits per channel (64 colors per channel)
-        quantized = (pixels >> 2) << 2
-        
-        # Get unique colors and their counts
-        unique, counts = np.unique(quantized, axis=0, return_counts=True)
-        
-        # Sort by frequency
-        idx = np.argsort(-counts)[:n_colors]
+        # and pack each pixel into one 18-bit key so a flat histogram
+        # replaces a row-wise sort
+        if _gpu_features_enabled():
+            idx, top_counts = _top_colors_gpu(pixels, n_colors)
+        else:
+            q = (pixels >> 2).astype(np.uint32)
+            keys = (q[:, 0] << 12) | (q[:, 1] << 6) | q[:, 2]
+            counts = np.bincount(keys, minlength=1 << 18)
+            
+            # Top colors by frequency, ties in RGB order
+            idx = _top_k_keys(counts, n_colors)
+            top_counts = counts[idx]
         
         # Return as list of RGB tuples with percentages
         total_pixels = len(pixels)
         dominant_colors = []
-        for i in idx:
-            color = tuple(map(int, unique[i]))
-            percentage = round(counts[i] / total_pixels * 100, 1)
+        for key, count in zip(idx, top_counts):
+            if count == 0:
+                break
+            color = (int(key >> 12) << 2, int((key >> 6) & 0x3F) << 2, int(key & 0x3F) << 2)
+            percentage = round(count / total_pixels * 100, 1)
             dominant_colors.append({"color": color, "percentage": percentage})
         
         return dominant_colors
     
     @staticmethod
-    def _calculate_green_ratio(img_array: np.ndarray) -> float:
-        """Calculate the ratio of green pixels in image."""
+    def _split_channels(img_array: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Split RGB pixels into int16 channels shared by the ratio helpers."""
         if len(img_array.shape) != 3 or img_array.shape[2] != 3:
+            return None
+        
+        return tuple(img_array[:, :, c].astype(np.int16) for c in range(3))
+    
+    @staticmethod
+    def _calculate_green_ratio(channels: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> float:
+        """Calculate the ratio of green pixels in image."""
+        if channels is None:
             return 0.0
         
-        # Extract RGB channels
-        r, g, b = img_array[:, :, 0], img_array[:, :, 1], img_array[:, :, 2]
+        r, g, b = channels
         
-        # Green detection: green channel is significantly higher than red and blue
-        green_mask = (g > r * 1.2) & (g > b * 1.2) & (g > 40) & (g < 250)
+        # Green detection: green channel is significantly higher than red and
+        # blue (g > 1.2 * r in integer form, no float temporaries)
+        green_mask = (g * 5 > r * 6) & (g * 5 > b * 6) & (g > 40) & (g < 250)
         
         return round(float(np.sum(green_mask) / green_mask.size), 3)
     
     @staticmethod
-    def _calculate_brown_ratio(img_array: np.ndarray) -> float:
+    def _calculate_brown_ratio(channels: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> float:
         """Calculate the ratio of brown pixels (potential dead/diseased areas)."""
-        if len(img_array.shape) != 3 or img_array.shape[2] != 3:
+        if channels is None:
             return 0.0
         
-        # Extract RGB channels
-        r, g, b = img_array[:, :, 0], img_array[:, :, 1], img_array[:, :, 2]
+        r, g, b = channels
         
         # Brown detection: red > green > blue, and not too bright
         brown_mask = (r > g) & (g > b) & (r > 50) & (r < 180) & (g > 30) & (g < 140)
@@ -208,21 +526,25 @@ class ImageProcessor:
     
     @staticmethod
     def _calculate_texture_complexity(img_array: np.ndarray) -> float:
-        """Calculate texture complexity using edge detection."""
+        """Calculate texture complexity using Sobel edge detection."""
         if len(img_array.shape) == 3:
-            # Convert to grayscale
-            gray = np.mean(img_array, axis=2).astype(np.uint8)
+            # Leaf texture lives in the green channel, no grayscale needed
+            channel = img_array[:, :, 1]
         else:
-            gray = img_array
+            channel = img_array
         
-        # Simple edge detection using gradient
-        grad_x = np.abs(np.diff(gray, axis=0))
-        grad_y = np.abs(np.diff(gray, axis=1))
+        # Separable 3x3 Sobel in int16 (|G| <= 1020), border pixels repeated
+        padded = np.pad(channel.astype(np.int16), 1, mode="edge")
+        smooth_cols = padded[:, :-2] + 2 * padded[:, 1:-1] + padded[:, 2:]
+        smooth_rows = padded[:-2] + 2 * padded[1:-1] + padded[2:]
+        grad_x = smooth_cols[2:] - smooth_cols[:-2]
+        grad_y = smooth_rows[:, 2:] - smooth_rows[:, :-2]
         
-        # Average gradient magnitude
-        avg_gradient = (np.mean(grad_x) + np.mean(grad_y)) / 2
+        # Approximate gradient magnitude |Gx| + |Gy| (no sqrt, no float image)
+        magnitude = np.abs(grad_x, out=grad_x)
+        magnitude += np.abs(grad_y, out=grad_y)
         
-        return round(float(avg_gradient), 2)
+        return round(float(magnitude.mean()), 2)
     
     @staticmethod
     def _detect_leaf_edges(img_array: np.ndarray) -> dict:
@@ -233,8 +555,8 @@ class ImageProcessor:
         else:
             green = img_array
         
-        # Simple edge detection
-        edges = np.abs(np.diff(green, axis=0))
+        # Simple edge detection (signed, so uint8 doesn't wrap)
+        edges = np.abs(np.diff(green.astype(np.int16), axis=0))
         edge_strength = float(np.mean(edges))
         
         return {
@@ -242,74 +564,140 @@ class ImageProcessor:
             "has_clear_edges": edge_strength > 20
         }
     
-    @staticmethod
-    def _detect_visual_issues(features: dict) -> list:
+    @classmethod
+    def _detect_visual_issues(cls, features: dict) -> list:
         """Detect potential plant issues based on visual features."""
-        issues = []
-        
-        # Check for too much brown (potential disease/dead areas)
-        if features.get("brown_ratio", 0) > 0.3:
-            issues.append("High brown color ratio - possible dead or diseased areas")
-        
-        # Check for low green ratio
-        if features.get("green_ratio", 0) < 0.1:
-            issues.append("Low green color ratio - may not be a healthy plant")
-        
-        # Check brightness issues
-        brightness = features.get("brightness", 128)
-        if brightness < 50:
-            issues.append("Image too dark for accurate analysis")
-        elif brightness > 220:
-            issues.append("Image overexposed - details may be lost")
-        
-        # Check contrast
-        if features.get("contrast", 50) < 20:
-            issues.append("Low contrast - image may be blurry or out of focus")
-        
-        return issues
+        return [
+            message
+            for key, op, threshold, message in cls._ISSUE_RULES
+            if op(features.get(key, cls._ISSUE_DEFAULTS[key]), threshold)
+        ]
     
     @classmethod
     async def validate_plant_image(cls, image_data: bytes) -> Tuple[bool, Optional[str]]:
         """
         Validate if image contains a plant.
         
+        Results are memoized by image hash, so repeated uploads of the same
+        photo skip decoding and feature extraction. The processed image is
+        kept as well, so a following process_image call for the same upload
+        doesn't run the pipeline again.
+        
         Args:
             image_data: Image bytes
             
         Returns:
             Tuple of (is_valid, error_message)
         """
+        image_hash = cls._image_hash(image_data)
+        cached = await cls._get_cached_validation(image_hash)
+        if cached is not None:
+            return cached
+        
         try:
-            # Process image first
-            processed_data, metadata = await cls.process_image(image_data)
-            
-            # Extract features
-            features = await cls.extract_plant_features(processed_data)
-            
-            # Check for critical issues
-            if features.get("green_ratio", 0) < 0.05:
-                return False, "Image doesn't appear to contain a plant (very low green content)"
-            
-            brightness = features.get("brightness", 128)
-            if brightness < 30:
-                return False, "Image is too dark for analysis"
-            elif brightness > 250:
-                return False, "Image is too bright/overexposed for analysis"
-            
-            # Check image size
-            if metadata.get("original_size", (0, 0))[0] < cls.MIN_SIZE[0]:
-                return False, f"Image too small. Minimum size is {cls.MIN_SIZE[0]}x{cls.MIN_SIZE[1]} pixels"
-            
-            # Warn about potential issues but don't reject
-            issues = features.get("potential_issues", [])
-            if issues:
-                logger.warning(f"Image has potential issues: {issues}")
-            
-            return True, None
-            
+            result, processed_data, metadata = await _run_in_pool(cls._check_plant_image_sync, image_data)
         except Exception as e:
-            logger.error(f"Error validating image: {e}")
-            return False, str(e)
+            logger.error("Error validating image: %s", e)
+            return False, "Failed to process image"
+        
+        cls._remember_processed(image_hash, processed_data, metadata)
+        await cls._cache_validation(image_hash, result)
+        return result
+    
+    @classmethod
+    def _check_plant_image_sync(cls, image_data: bytes) -> Tuple[Tuple[bool, Optional[str]], bytes, dict]:
+        """Process the upload and run the validation checks on it (worker pool)."""
+        # Process image first
+        image, processed_data, metadata = cls._render_image(image_data)
+        result = cls._check_processed_image(image, metadata)
+        return result, processed_data, metadata
+    
+    @classmethod
+    def _check_processed_image(cls, image: Image.Image, metadata: dict) -> Tuple[bool, Optional[str]]:
+        """Run the validation checks on a processed image."""
+        # Check image size (metadata only, so it goes before any pixel work)
+        if metadata.get("original_size", (0, 0))[0] < cls.MIN_SIZE[0]:
+            return False, f"Image too small. Minimum size is {cls.MIN_SIZE[0]}x{cls.MIN_SIZE[1]} pixels"
+        
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image = cls._downsample_for_features(image)
+        
+        # Brightness comes from the PIL buffer, so dark or overexposed
+        # uploads are rejected before any pixel array is materialized.
+        # It stays ahead of the green gate: a dark photo is reported as
+        # too dark, not as containing no plant.
+        stats = cls._brightness_contrast(image)
+        brightness = stats["brightness"]
+        if brightness < 30:
+            return False, "Image is too dark for analysis"
+        elif brightness > 250:
+            return False, "Image is too bright/overexposed for analysis"
+        
+        # Green ratio is the other cheap gate, checked before the heavy kernels
+        img_array = np.asarray(image)
+        channels = cls._split_channels(img_array)
+        green_ratio = cls._calculate_green_ratio(channels)
+        if green_ratio < 0.05:
+            return False, "Image doesn't appear to contain a plant (very low green content)"
+        
+        # Extract the remaining features from the in-memory pixels
+        features = {**stats, "green_ratio": green_ratio, **cls._expensive_features(img_array, channels)}
+        features["potential_issues"] = cls._detect_visual_issues(features)
+        
+        # Warn about potential issues but don't reject
+        issues = features.get("potential_issues", [])
+        if issues:
+            logger.warning("Image has potential issues: %s", issues)
+        
+        return True, None
+    
+    @classmethod
+    async def _get_cached_validation(cls, image_hash: str) -> Optional[Tuple[bool, Optional[str]]]:
+        """Look up a validation result in the local LRU, then in Redis."""
+        result = _VALIDATION_CACHE.get(image_hash)
+        if result is not None:
+            _VALIDATION_CACHE.move_to_end(image_hash)
+            return result
+        
+        cached = await cache_get(f"{cls.VALIDATION_CACHE_PREFIX}{image_hash}")
+        if cached is None:
+            return None
+        is_valid, error_message = json.loads(cached)
+        result = (is_valid, error_message)
+        cls._remember_validation(image_hash, result)
+        return result
+    
+    @classmethod
+    async def _cache_validation(cls, image_hash: str, result: Tuple[bool, Optional[str]]) -> None:
+        """Store a validation result locally and in Redis."""
+        cls._remember_validation(image_hash, result)
+        await cache_set(
+            f"{cls.VALIDATION_CACHE_PREFIX}{image_hash}",
+            json.dumps(result),
+            cls.VALIDATION_CACHE_TTL,
+        )
+    
+    @classmethod
+    def _remember_processed(cls, image_hash: str, processed_data: bytes, metadata: dict) -> None:
+        """Keep a processed image in the local LRU, evicting the oldest entry when full."""
+        _PROCESSED_CACHE[image_hash] = (processed_data, dict(metadata))
+        _PROCESSED_CACHE.move_to_end(image_hash)
+        if len(_PROCESSED_CACHE) > cls.PROCESSED_CACHE_SIZE:
+            _PROCESSED_CACHE.popitem(last=False)
+    
+    @classmethod
+    def _remember_validation(cls, image_hash: str, result: Tuple[bool, Optional[str]]) -> None:
+        """Insert into the local LRU, evicting the oldest entry when full."""
+        _VALIDATION_CACHE[image_hash] = result
+        _VALIDATION_CACHE.move_to_end(image_hash)
+        if len(_VALIDATION_CACHE) > cls.VALIDATION_CACHE_SIZE:
+            _VALIDATION_CACHE.popitem(last=False)
+    
+    @staticmethod
+    def _image_hash(image_data: bytes) -> str:
+        """Hash raw image bytes for deduplication (128-bit hex, same length as MD5)."""
+        return blake3.blake3(image_data).hexdigest(length=16)
     
     @classmethod
     async def save_image(cls, image_data: bytes, user_id: str, plant_id: Optional[str] = None) -> str:
@@ -326,12 +714,12 @@ class ImageProcessor:
         """
         try:
             # Create upload directory structure
-            upload_dir = settings.UPLOAD_DIR / user_id
+            upload_dir = get_settings().upload_path / user_id
             upload_dir.mkdir(parents=True, exist_ok=True)
             
             # Generate filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            image_hash = hashlib.md5(image_data).hexdigest()[:8]
+            image_hash = blake3.blake3(image_data).hexdigest(length=4)
             
             if plant_id:
                 filename = f"plant_{plant_id}_{timestamp}_{image_hash}.jpg"
@@ -343,9 +731,9 @@ class ImageProcessor:
             with open(file_path, "wb") as f:
                 f.write(image_data)
             
-            logger.info(f"Saved image: {file_path}")
+            logger.info("Saved image: %s", file_path)
             return str(file_path)
             
         except Exception as e:
-            logger.error(f"Error saving image: {e}")
+            logger.error("Error saving image: %s", e)
             raise
@@ -0,0 +1,199 @@
+"""Shared OpenAI client service."""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+from agents.strict_schema import ensure_strict_json_schema
+from openai import (
+    APIConnectionError,
+    AsyncOpenAI,
+    InternalServerError,
+    OpenAIError,
+    RateLimitError,
+)
+from pydantic import BaseModel
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+_CLIENT: Optional[AsyncOpenAI] = None
+_PRIORITY_BODY = {"service_tier": "priority"}
+
+# Per-request deadline for tool calls; the client retries a timed-out
+# request instead of waiting out a long latency tail
+TOOL_TIMEOUT = httpx.Timeout(20.0, connect=5.0)
+
+# Extra read time per additional item of a batch tool call
+_BATCH_ITEM_TIMEOUT = 5.0
+
+# Failures that mean the API itself is unhealthy (timeouts are a subclass
+# of APIConnectionError); these are what trips the circuit breaker
+_TRANSIENT_ERRORS = (APIConnectionError, InternalServerError, RateLimitError)
+_BREAKER_FAIL_MAX = 10
+_BREAKER_RESET_SECONDS = 30.0
+
+
+class CircuitOpenError(OpenAIError):
+    """Raised instead of calling the API while the circuit breaker is open."""
+
+
+class _CircuitBreaker:
+    """Consecutive-failure circuit breaker shared by all tool requests."""
+
+    __slots__ = ("_failures", "_opened_at")
+
+    def __init__(self) -> None:
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+
+    def check(self) -> None:
+        """Fail fast while open; after the reset timeout let requests probe the API."""
+        if self._opened_at is not None and time.monotonic() - self._opened_at < _BREAKER_RESET_SECONDS:
+            raise CircuitOpenError("OpenAI circuit breaker is open")
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        # In the half-open state one more failure reopens the breaker
+        if self._failures >= _BREAKER_FAIL_MAX:
+            if self._opened_at is None:
+                logger.warning("OpenAI circuit breaker opened after %s failures", self._failures)
+            self._opened_at = time.monotonic()
+
+
+_BREAKER = _CircuitBreaker()
+_SEMAPHORE: Optional[asyncio.Semaphore] = None
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """
+    Get the process-wide AsyncOpenAI client.
+
+    The client is created on first use and keeps a single httpx connection
+    pool, so repeated calls reuse TCP/TLS connections to the API. HTTP/2
+    lets concurrent tool calls multiplex over one connection.
+
+    Returns:
+        Shared AsyncOpenAI client
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = AsyncOpenAI(
+            api_key=get_settings().OPENAI_API_KEY,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=30,
+                http2=True,
+            ),
+            max_retries=2,
+        )
+    return _CLIENT
+
+
+def get_openai_semaphore() -> asyncio.Semaphore:
+    """
+    Get the semaphore that bounds in-flight OpenAI requests.
+
+    Tool calls from many users can fan out concurrently; holding this
+    semaphore around each request applies back-pressure locally before
+    the API's rate limiter starts rejecting requests.
+
+    Returns:
+        Shared semaphore sized by OPENAI_MAX_CONCURRENCY
+    """
+    global _SEMAPHORE
+    if _SEMAPHORE is None:
+        _SEMAPHORE = asyncio.Semaphore(get_settings().OPENAI_MAX_CONCURRENCY)
+    return _SEMAPHORE
+
+
+@asynccontextmanager
+async def openai_request() -> AsyncIterator[None]:
+    """
+    Guard a single tool request to the OpenAI API.
+
+    Fails fast with CircuitOpenError during a sustained outage, otherwise
+    holds the concurrency semaphore for the request and records whether
+    it hit a transient API failure. Retries themselves are left to the
+    client (max_retries), so an attempt is only counted once.
+
+    Yields:
+        None; wrap the ``create()`` call in the ``async with`` block
+    """
+    _BREAKER.check()
+    async with get_openai_semaphore():
+        try:
+            yield
+        except _TRANSIENT_ERRORS:
+            _BREAKER.record_failure()
+            raise
+    _BREAKER.record_success()
+
+
+def json_schema_format(name: str, model: type[BaseModel]) -> dict:
+    """
+    Build a strict structured-output ``response_format`` for a pydantic model.
+
+    ensure_strict_json_schema closes every object (additionalProperties:
+    false) and inlines ``$ref`` entries that carry descriptions, both of
+    which strict mode requires. Build the result once per model at import.
+
+    Args:
+        name: Schema name reported to the API
+        model: Pydantic model describing the expected reply
+
+    Returns:
+        Value for the ``response_format`` argument of ``create()``
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "schema": ensure_strict_json_schema(model.model_json_schema()),
+            "strict": True,
+        },
+    }
+
+
+def batch_timeout(items: int) -> httpx.Timeout:
+    """
+    Get the per-request deadline for a batch tool call.
+
+    Args:
+        items: Number of items answered in one response
+
+    Returns:
+        TOOL_TIMEOUT with its read budget grown by a few seconds per extra item
+    """
+    seconds = TOOL_TIMEOUT.read + _BATCH_ITEM_TIMEOUT * max(0, items - 1)
+    return httpx.Timeout(seconds, connect=TOOL_TIMEOUT.connect)
+
+
+def priority_extra_body() -> Optional[dict]:
+    """
+    Get the ``extra_body`` for latency-sensitive requests.
+
+    Priority processing trades a higher per-token price for lower and
+    more stable time to first token, so it is opt-in via PRIORITY_TIER.
+
+    Returns:
+        Body requesting the priority service tier, or None when disabled
+    """
+    return _PRIORITY_BODY if get_settings().PRIORITY_TIER else None
+
+
+async def close_openai_client() -> None:
+    """Close the shared client and its connection pool."""
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.close()
+        _CLIENT = None
+        logger.info("OpenAI client closed")
@@ -1,7 +1,7 @@
 """Plant knowledge service."""
 
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +19,7 @@ class PlantKnowledgeBase:
             "care": {
                 "light": "Bright, indirect light",
                 "water": "Water when top 2-3 inches of soil are dry",
+                "water_interval_days": 9,  # medium pot, spring, ~40% soil moisture
                 "humidity": "Prefers 60% or higher",
                 "temperature": "65-85°F (18-29°C)",
                 "soil": "Well-draining potting mix",
@@ -38,6 +39,7 @@ class PlantKnowledgeBase:
             "care": {
                 "light": "Bright, indirect to direct light",
                 "water": "Water when top inch is dry",
+                "water_interval_days": 7,  # medium pot, spring, ~40% soil moisture
                 "humidity": "40-60%",
                 "temperature": "60-75°F (15-24°C)",
                 "soil": "Well-draining, slightly acidic",
@@ -83,8 +85,100 @@ class PlantKnowledgeBase:
         },
     }
     
+    # Treatments for common pests
+    PEST_SOLUTIONS = {
+        "aphids": [
+            {
+                "method": "Neem oil spray",
+                "description": "Mix 2 tsp neem oil with 1 quart water and spray",
+                "frequency": "Every 3-4 days until gone",
+            },
+            {
+                "method": "Insecticidal soap",
+                "description": "Spray directly on aphids",
+                "frequency": "Daily until eliminated",
+            },
+        ],
+        "spider_mites": [
+            {
+                "method": "Increase humidity",
+                "description": "Mist regularly or use humidifier",
+                "frequency": "Daily",
+            },
+            {
+                "method": "Rubbing alcohol",
+                "description": "70% isopropyl alcohol on cotton swab",
+                "frequency": "Spot treat affected areas",
+            },
+        ],
+        "fungus_gnats": [
+            {
+                "method": "Let soil dry",
+                "description": "Allow top 2 inches to dry between watering",
+                "frequency": "Adjust watering schedule",
+            },
+            {
+                "method": "Sticky traps",
+                "description": "Yellow sticky traps near soil",
+                "frequency": "Replace when full",
+            },
+        ],
+    }
+    
+    # Lookup indexes over PLANT_DATABASE, built once by _build_indexes()
+    _NORMALIZED_INDEX: Dict[str, Dict] = {}  # normalized key / common name -> info
+    _SEARCH_NAMES: Dict[str, Tuple[str, ...]] = {}  # plant key -> names for partial matching
+    _TRIGRAM_INDEX: Dict[str, Set[str]] = {}  # name trigram -> plant keys
+    
+    @staticmethod
+    def _normalize(name: str) -> str:
+        """Normalize a plant name the way lookups do."""
+        return name.lower().replace(" ", "_")
+    
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        """Split text into its overlapping three-character substrings."""
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+    
+    @classmethod
+    def _build_indexes(cls) -> None:
+        """Precompute the exact and trigram lookup indexes."""
+        cls._NORMALIZED_INDEX = {}
+        cls._SEARCH_NAMES = {}
+        cls._TRIGRAM_INDEX = {}
+        
+        for key, info in cls.PLANT_DATABASE.items():
+            common_name = cls._normalize(info["common_name"])
+            cls._NORMALIZED_INDEX.setdefault(common_name, info)
+            cls._SEARCH_NAMES[key] = (key, common_name)
+            
+            for name in (key, common_name):
+                for trigram in cls._trigrams(name):
+                    cls._TRIGRAM_INDEX.setdefault(trigram, set()).add(key)
+        
+        # Plant keys win over common names that happen to collide
+        cls._NORMALIZED_INDEX.update(cls.PLANT_DATABASE)
+    
     @classmethod
-    async def get_plant_info(cls, plant_identifier: str) -> Optional[Dict]:
+    def _partial_candidates(cls, normalized: str) -> Set[str]:
+        """Narrow down plant keys that may contain the query as a substring."""
+        # Every name containing the query contains all of its trigrams, so the
+        # intersection never drops a real match
+        trigrams = cls._trigrams(normalized)
+        if not trigrams:
+            # Too short for trigrams, the catalog is scanned directly
+            return set(cls._SEARCH_NAMES)
+        
+        candidates: Optional[Set[str]] = None
+        for trigram in trigrams:
+            keys = cls._TRIGRAM_INDEX.get(trigram)
+            if not keys:
+                return set()
+            candidates = keys if candidates is None else candidates & keys
+        return candidates or set()
+    
+    @classmethod
+    def get_plant_info(cls, plant_identifier: str) -> Optional[Dict]:
         """
         Get plant information from knowledge base.
         
@@ -95,21 +189,27 @@ class PlantKnowledgeBase:
             Plant information dict or None
         """
         # Normalize identifier
-        normalized = plant_identifier.lower().replace(" ", "_")
+        normalized = cls._normalize(plant_identifier.strip())
+        if not normalized:
+            return None
         
-        # Try exact match first
-        if normalized in cls.PLANT_DATABASE:
-            return cls.PLANT_DATABASE[normalized]
+        # Try exact match on key or common name first
+        info = cls._NORMALIZED_INDEX.get(normalized)
+        if info is not None:
+            return info
         
-        # Try partial match
-        for key, info in cls.PLANT_DATABASE.items():
-            if normalized in key or normalized in info["common_name"].lower():
-                return info
+        # Try partial match, preferring the shortest matching key
+        matches = [
+            key for key in cls._partial_candidates(normalized)
+            if any(normalized in name for name in cls._SEARCH_NAMES[key])
+        ]
+        if matches:
+            return cls.PLANT_DATABASE[min(matches, key=lambda key: (len(key), key))]
         
         return None
     
     @classmethod
-    async def get_seasonal_care(cls, season: str) -> Dict:
+    def get_seasonal_care(cls, season: str) -> Dict:
         """
         Get seasonal care recommendations.
         
@@ -122,7 +222,7 @@ class PlantKnowledgeBase:
         return cls.SEASONAL_CARE.get(season.lower(), cls.SEASONAL_CARE["spring"])
     
     @classmethod
-    async def get_pest_solutions(cls, pest_type: str) -> List[Dict]:
+    def get_pest_solutions(cls, pest_type: str) -> List[Dict]:
         """
         Get solutions for common plant pests.
         
@@ -132,49 +232,10 @@ class PlantKnowledgeBase:
         Returns:
             List of treatment options
         """
-        pest_solutions = {
-            "aphids": [
-                {
-                    "method": "Neem oil spray",
-                    "description": "Mix 2 tsp neem oil with 1 quart water and spray",
-                    "frequency": "Every 3-4 days until gone",
-                },
-                {
-                    "method": "Insecticidal soap",
-                    "description": "Spray directly on aphids",
-                    "frequency": "Daily until eliminated",
-                },
-            ],
-            "spider_mites": [
-                {
-                    "method": "Increase humidity",
-                    "description": "Mist regularly or use humidifier",
-                    "frequency": "Daily",
-                },
-                {
-                    "method": "Rubbing alcohol",
-                    "description": "70% isopropyl alcohol on cotton swab",
-                    "frequency": "Spot treat affected areas",
-                },
-            ],
-            "fungus_gnats": [
-                {
-                    "method": "Let soil dry",
-                    "description": "Allow top 2 inches to dry between watering",
-                    "frequency": "Adjust watering schedule",
-                },
-                {
-                    "method": "Sticky traps",
-                    "description": "Yellow sticky traps near soil",
-                    "frequency": "Replace when full",
-                },
-            ],
-        }
-        
-        return pest_solutions.get(pest_type.lower(), [])
+        return cls.PEST_SOLUTIONS.get(pest_type.lower(), [])
     
     @classmethod
-    async def get_fertilizer_guide(cls, plant_type: str, season: str) -> Dict:
+    def get_fertilizer_guide(cls, plant_type: str, season: str) -> Dict:
         """
         Get fertilizer recommendations.
         
@@ -201,3 +262,6 @@ class PlantKnowledgeBase:
             "signs_needed": ["Slow growth", "Pale leaves", "Small new leaves"],
             "signs_excess": ["Salt buildup", "Brown leaf tips", "Rapid weak growth"],
         }
+
+
+PlantKnowledgeBase._build_indexes()
@@ -1,20 +1,27 @@
+import asyncio
+import hashlib
 import json
 import logging
-import re
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import Final, List, Dict, TypeVar
 
 from agents import function_tool
-from pydantic import BaseModel, Field, ConfigDict
-from openai import AsyncOpenAI
+from openai import OpenAIError
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, ValidationError
+from typing_extensions import TypedDict
 
-from config.settings import settings
+from services.cache import cache_get, cache_set
+from services.openai_client import TOOL_TIMEOUT, get_openai_client, json_schema_format, openai_request
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Ответы с temperature=0.3 достаточно стабильны, чтобы переиспользовать их неделю
+_CARE_CACHE_TTL = 7 * 24 * 3600
+
 
 class CareInstructions(BaseModel):
-    model_config = ConfigDict(extra="forbid")  # 💥 обязательный параметр
+    model_config = ConfigDict(extra="ignore")  # ответ LLM: лишние поля отбрасываем
     watering: str = Field(description="Рекомендации по поливу")
     lighting: str = Field(description="Рекомендации по освещению")
     soil: str = Field(description="Рекомендации по почве")
@@ -22,7 +29,7 @@ class CareInstructions(BaseModel):
 
 
 class FertilizerRecommendation(BaseModel):
-    model_config = ConfigDict(extra="forbid")  # 💥 обязательный параметр
+    model_config = ConfigDict(extra="ignore")  # ответ LLM: лишние поля отбрасываем
     name: str = Field(description="Название удобрения")
     npk_ratio: str = Field(description="Соотношение NPK")
     frequency: str = Field(description="Как часто применять")
@@ -32,13 +39,25 @@ class FertilizerRecommendation(BaseModel):
 
 
 class ToolRecommendation(BaseModel):
-    model_config = ConfigDict(extra="forbid")  # 💥 обязательный параметр
+    model_config = ConfigDict(extra="ignore")  # ответ LLM: лишние поля отбрасываем
     name: str = Field(description="Название инструмента")
     purpose: str = Field(description="Назначение")
     price_range: str = Field(description="Диапазон цен")
     brand: str = Field(description="Рекомендуемый бренд")
     purchase_links: List[str] = Field(description="Где купить (общие магазины, без конкретных URL)")
 
+
+# Strict structured outputs требуют объект на верхнем уровне, поэтому списки обёрнуты
+class FertilizerList(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    fertilizers: List[FertilizerRecommendation] = Field(description="Рекомендуемые удобрения")
+
+
+class ToolList(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    tools: List[ToolRecommendation] = Field(description="Рекомендуемые инструменты")
+
+
 class DiagnosisInput(BaseModel):
     model_config = ConfigDict(extra="forbid")
     health_score: float = Field(description="Индекс здоровья растения (1-10)")
@@ -48,12 +67,228 @@ class DiagnosisInput(BaseModel):
     recommendations: list[str] = Field(description="Список рекомендаций по первичным действиям")
 
 
+class CarePlan(BaseModel):
+    model_config = ConfigDict(extra="ignore")  # ответ LLM: лишние поля отбрасываем
+    care: CareInstructions = Field(description="Рекомендации по уходу")
+    fertilizers: List[FertilizerRecommendation] = Field(description="Рекомендуемые удобрения")
+    tools: List[ToolRecommendation] = Field(description="Рекомендуемые инструменты")
+
+
+# Инструменты возвращают простые dict той же формы: агент только читает поля, поэтому
+# экземпляры моделей не создаются. Кому нужна модель — CareInstructions.model_validate(d).
+class CareInstructionsDict(TypedDict):
+    watering: str
+    lighting: str
+    soil: str
+    seasonal_tips: List[str]
+
+
+class FertilizerDict(TypedDict):
+    name: str
+    npk_ratio: str
+    frequency: str
+    amount: str
+    organic: bool
+    price_range: str
+
+
+class ToolDict(TypedDict):
+    name: str
+    purpose: str
+    price_range: str
+    brand: str
+    purchase_links: List[str]
+
+
+class CarePlanDict(TypedDict):
+    care: CareInstructionsDict
+    fertilizers: List[FertilizerDict]
+    tools: List[ToolDict]
+
+
+class _FertilizerListDict(TypedDict):
+    fertilizers: List[FertilizerDict]
+
+
+class _ToolListDict(TypedDict):
+    tools: List[ToolDict]
+
+
+# Валидаторы собираются один раз; validate_json отдаёт dict прямо из pydantic-core
+_CARE_ADAPTER: Final[TypeAdapter] = TypeAdapter(CareInstructionsDict)
+_FERTILIZERS_ADAPTER: Final[TypeAdapter] = TypeAdapter(_FertilizerListDict)
+_TOOLS_ADAPTER: Final[TypeAdapter] = TypeAdapter(_ToolListDict)
+_CARE_PLAN_ADAPTER: Final[TypeAdapter] = TypeAdapter(CarePlanDict)
+
+
+# Схемы строятся один раз при импорте
+_CARE_FORMAT = json_schema_format("CareInstructions", CareInstructions)
+_FERTILIZERS_FORMAT = json_schema_format("FertilizerList", FertilizerList)
+_TOOLS_FORMAT = json_schema_format("ToolList", ToolList)
+_CARE_PLAN_FORMAT = json_schema_format("CarePlan", CarePlan)
+
+# Системные промпты статичны, поэтому собираются один раз при импорте
+_SYS_CARE: Final[str] = (
+    "Ты — эксперт по уходу за растениями. "
+    "Тебе дан диагноз в формате JSON и текущее время года. "
+    "Верни строго JSON с ключами: watering, lighting, soil, seasonal_tips.\n"
+    "Пример:\n"
+    "{\n"
+    '  "watering": "Полив раз в 5 дней...",\n'
+    '  "lighting": "Нужен рассеянный свет...",\n'
+    '  "soil": "Рекомендуется плодородная, питательная почва...",\n'
+    '  "seasonal_tips": ["Совет 1", "Совет 2"]\n'
+    "}\n"
+    "Никакого дополнительного текста."
+)
+
+_SYS_FERT: Final[str] = (
+    "Ты — эксперт по удобрениям для домашних растений. "
+    "На вход тебе даются тип растения, состояние почвы и время года. "
+    "Верни строго JSON-объект с ключом fertilizers — массивом из трёх объектов с полями:\n"
+    "  name, npk_ratio, frequency, amount, organic, price_range.\n"
+    "Пример ответа:\n"
+    "{\"fertilizers\": [\n"
+    "  {\"name\": \"Удобрение A\", \"npk_ratio\": \"10-10-10\", \"frequency\": \"раз в 2 недели\", "
+    "\"amount\": \"5 г\", \"organic\": true, \"price_range\": \"500-700 ₽\"},\n"
+    "  {\"name\": \"Удобрение B\", \"npk_ratio\": \"20-20-20\", \"frequency\": \"раз в месяц\", "
+    "\"amount\": \"7 г\", \"organic\": false, \"price_range\": \"400-600 ₽\"},\n"
+    "  {\"name\": \"Удобрение C\", \"npk_ratio\": \"5-5-5\", \"frequency\": \"раз в 3 недели\", "
+    "\"amount\": \"10 г\", \"organic\": true, \"price_range\": \"600-800 ₽\"}\n"
+    "]}\n"
+    "Никакого другого текста."
+)
+
+_SYS_TOOLS: Final[str] = (
+    "Ты — бот, отвечающий за подбор садового инвентаря. "
+    "На вход тебе дается задача по уходу (care_task) и размер растения. "
+    "Верни строго JSON-объект с ключом tools — массивом из трёх объектов с ключами:\n"
+    "  name, purpose, price_range, brand, purchase_links.\n"
+    "Пример:\n"
+    "{\"tools\": [\n"
+    "  {\"name\": \"Ножницы для обрезки\", \"purpose\": \"обрезка сухих веток\", "
+    "\"price_range\": \"500-700 ₽\", \"brand\": \"Gardena\", "
+    "\"purchase_links\": [\"Леруа Мерлен\", \"Ozon\"]},\n"
+    "  {\"name\": \"Перчатки садовые\", \"purpose\": \"защита рук\", "
+    "\"price_range\": \"200-300 ₽\", \"brand\": \"Fiskars\", "
+    "\"purchase_links\": [\"Петрович\", \"Wildberries\"]},\n"
+    "  {\"name\": \"Компостёр\", \"purpose\": \"приготовление компоста\", "
+    "\"price_range\": \"1500-2000 ₽\", \"brand\": \"BioMaster\", "
+    "\"purchase_links\": [\"Ozon\", \"Садовый центр\"]}\n"
+    "]}\n"
+    "Никакого лишнего текста."
+)
+
+_SYS_PLAN: Final[str] = (
+    "Ты — эксперт по уходу за домашними растениями, удобрениям и садовому инвентарю. "
+    "Верни строго JSON-объект с тремя ключами:\n"
+    '  "care": объект с ключами watering, lighting, soil (строки) и seasonal_tips (массив строк);\n'
+    '  "fertilizers": массив из трёх объектов с ключами name, npk_ratio, frequency, amount, '
+    "organic (true/false), price_range;\n"
+    '  "tools": массив из трёх объектов с ключами name, purpose, price_range, brand, '
+    "purchase_links (массив названий магазинов, без URL).\n"
+    "Никакого дополнительного текста."
+)
+
+_CARE_MESSAGES: Final[tuple] = ({"role": "system", "content": _SYS_CARE},)
+_FERT_MESSAGES: Final[tuple] = ({"role": "system", "content": _SYS_FERT},)
+_TOOLS_MESSAGES: Final[tuple] = ({"role": "system", "content": _SYS_TOOLS},)
+_PLAN_MESSAGES: Final[tuple] = ({"role": "system", "content": _SYS_PLAN},)
+
+# «Пустые» ответы на случай ошибки создаются один раз, а не в каждом except;
+# наружу отдаётся model_dump(), поэтому вызывающий не может испортить дефолт
+_DEFAULT_CARE: Final[CareInstructions] = CareInstructions(
+    watering="Не удалось сгенерировать рекомендации по поливу.",
+    lighting="Не удалось сгенерировать рекомендации по освещению.",
+    soil="Не удалось сгенерировать рекомендации по почве.",
+    seasonal_tips=["Не удалось сгенерировать сезонные советы."],
+)
+_DEFAULT_FERTILIZERS: Final[tuple] = (
+    FertilizerRecommendation(
+        name="Универсальное удобрение",
+        npk_ratio="NPK неизвестно",
+        frequency="раз в месяц",
+        amount="5 г",
+        organic=False,
+        price_range="от 300 ₽",
+    ),
+)
+_DEFAULT_TOOLS: Final[tuple] = (
+    ToolRecommendation(
+        name="Стандартные перчатки",
+        purpose="защита рук при уходе",
+        price_range="200-300 ₽",
+        brand="Generic",
+        purchase_links=["Любой садовый магазин"],
+    ),
+)
+
+# Зимой при здоровой почве растения в покое и подкормка не нужна, LLM для этого не вызываем
+_DORMANT_FERTILIZERS: Final[tuple] = (
+    FertilizerRecommendation(
+        name="Без подкормки",
+        npk_ratio="—",
+        frequency="не подкармливать до весны (период покоя)",
+        amount="0 г",
+        organic=False,
+        price_range="0 ₽",
+    ),
+)
+_WINTER_SEASONS: Final[frozenset] = frozenset({"winter", "зима", "зимой"})
+_HEALTHY_SOILS: Final[frozenset] = frozenset({"healthy", "good", "normal", "здоровая", "хорошая", "нормальная"})
+_FERT_SHORTCUTS: Final[dict] = {
+    (soil, season): _DORMANT_FERTILIZERS for soil in _HEALTHY_SOILS for season in _WINTER_SEASONS
+}
+
+
+def _cache_key(task: str, *inputs) -> str:
+    """Ключ кеша по задаче и каноническому JSON входных данных."""
+    canonical = json.dumps(inputs, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return f"care:{task}:{hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()}"
+
+
+async def _complete_structured(
+    cache_key: str,
+    messages: list,
+    response_format: dict,
+    adapter: TypeAdapter[T],
+    max_tokens: int,
+) -> T:
+    """
+    Общий путь для всех инструментов ухода: кеш, запрос к LLM со strict-схемой,
+    валидация ответа и запись в кеш. Временные ошибки API (429, 5xx, таймауты,
+    обрывы соединения) повторяет сам клиент OpenAI с экспоненциальной задержкой;
+    если повторы не помогли, OpenAIError или ValidationError пробрасываются
+    вызывающему, который возвращает свой дефолт.
+    """
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return adapter.validate_json(cached)
+
+    async with openai_request():
+        response = await get_openai_client().chat.completions.create(
+            model="gpt-4.1-mini",
+            temperature=0.3,
+            messages=messages,
+            response_format=response_format,
+            max_tokens=max_tokens,
+            timeout=TOOL_TIMEOUT,
+        )
+
+    text = response.choices[0].message.content
+    logger.debug("Raw %s response: %s", response_format["json_schema"]["name"], text)
+
+    result = adapter.validate_json(text)
+    await cache_set(cache_key, text, _CARE_CACHE_TTL)
+    return result
+
+
 @function_tool
 async def generate_care_instructions(
     plant_id: str,
     diagnosis: DiagnosisInput,
     season: str,
-) -> CareInstructions:
+) -> CareInstructionsDict:
     """
     Инструмент для генерации рекомендаций по уходу на основе диагноза и сезона.
     Возвращаемый JSON строго в формате:
@@ -64,24 +299,16 @@ async def generate_care_instructions(
       "seasonal_tips": ["<строка1>", "<строка2>", ...]
     }
     """
-    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-
-    # Подготавливаем JSON-строку с диагнозом для LLM
-    diag_json = json.dumps(diagnosis, ensure_ascii=False)
-
-    system_prompt = (
-        "Ты — эксперт по уходу за растениями. "
-        "Тебе дан диагноз в формате JSON и текущее время года. "
-        "Верни строго JSON с ключами: watering, lighting, soil, seasonal_tips.\n"
-        "Пример:\n"
-        "{\n"
-        '  "watering": "Полив раз в 5 дней...",\n'
-        '  "lighting": "Нужен рассеянный свет...",\n'
-        '  "soil": "Рекомендуется плодородная, питательная почва...",\n'
-        '  "seasonal_tips": ["Совет 1", "Совет 2"]\n'
-        "}\n"
-        "Никакого дополнительного текста."
-    )
+    return await _generate_care_instructions(plant_id, diagnosis, season)
+
+
+async def _generate_care_instructions(
+    plant_id: str,
+    diagnosis: DiagnosisInput,
+    season: str,
+) -> CareInstructionsDict:
+    # Подготавливаем JSON-строку с диагнозом для LLM (сериализует pydantic-core)
+    diag_json = diagnosis.model_dump_json()
 
     user_prompt = (
         f"Диагноз:\n{diag_json}\nСезон: {season}.\n\n"
@@ -89,31 +316,18 @@ async def generate_care_instructions(
     )
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4.1-mini",
-            temperature=0.3,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+        return await _complete_structured(
+            _cache_key("instructions", diag_json, season),
+            [*_CARE_MESSAGES, {"role": "user", "content": user_prompt}],
+            _CARE_FORMAT,
+            _CARE_ADAPTER,
             max_tokens=700,
         )
 
-        instructions_text = response.choices[0].message.content.strip()
-        logger.info(f"Raw care instructions response: {instructions_text}")
-
-        data = json.loads(instructions_text)
-        return CareInstructions.model_validate(data)
-
-    except Exception as exc:
-        logger.error(f"Ошибка generate_care_instructions: {exc}", exc_info=True)
+    except (OpenAIError, ValidationError) as exc:
+        logger.error("Ошибка generate_care_instructions: %s", exc, exc_info=True)
         # Возвращаем «пустые» рекомендации
-        return CareInstructions(
-            watering="Не удалось сгенерировать рекомендации по поливу.",
-            lighting="Не удалось сгенерировать рекомендации по освещению.",
-            soil="Не удалось сгенерировать рекомендации по почве.",
-            seasonal_tips=["Не удалось сгенерировать сезонные советы."],
-        )
+        return _DEFAULT_CARE.model_dump()
 
 
 @function_tool
@@ -121,9 +335,9 @@ async def recommend_fertilizers(
     plant_type: str,
     soil_condition: str,
     season: str,
-) -> List[FertilizerRecommendation]:
+) -> List[FertilizerDict]:
     """
-    Инструмент для подбора удобрений. LLM возвращает строго JSON-массив объектов:
+    Инструмент для подбора удобрений. Возвращает список объектов:
     [
       {
         "name": "...",
@@ -136,69 +350,45 @@ async def recommend_fertilizers(
       ...
     ]
     """
-    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-
-    system_prompt = (
-        "Ты — эксперт по удобрениям для домашних растений. "
-        "На вход тебе даются тип растения, состояние почвы и время года. "
-        "Верни строго JSON-массив из трёх объектов с полями:\n"
-        "  name, npk_ratio, frequency, amount, organic, price_range.\n"
-        "Пример ответа:\n"
-        "[\n"
-        "  {\"name\": \"Удобрение A\", \"npk_ratio\": \"10-10-10\", \"frequency\": \"раз в 2 недели\", "
-        "\"amount\": \"5 г\", \"organic\": true, \"price_range\": \"500-700 ₽\"},\n"
-        "  {\"name\": \"Удобрение B\", \"npk_ratio\": \"20-20-20\", \"frequency\": \"раз в месяц\", "
-        "\"amount\": \"7 г\", \"organic\": false, \"price_range\": \"400-600 ₽\"},\n"
-        "  {\"name\": \"Удобрение C\", \"npk_ratio\": \"5-5-5\", \"frequency\": \"раз в 3 недели\", "
-        "\"amount\": \"10 г\", \"organic\": true, \"price_range\": \"600-800 ₽\"}\n"
-        "]\n"
-        "Никакого другого текста."
-    )
+    return await _recommend_fertilizers(plant_type, soil_condition, season)
+
+
+async def _recommend_fertilizers(
+    plant_type: str,
+    soil_condition: str,
+    season: str,
+) -> List[FertilizerDict]:
+    shortcut = _FERT_SHORTCUTS.get((soil_condition.strip().lower(), season.strip().lower()))
+    if shortcut is not None:
+        return [item.model_dump() for item in shortcut]
 
     user_prompt = (
         f"Тип растения: {plant_type}.\n"
         f"Состояние почвы: {soil_condition}.\n"
         f"Сезон: {season}.\n\n"
-        "Сформируй JSON-массив из трёх рекомендаций."
+        "Сформируй JSON с тремя рекомендациями."
     )
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4.1-mini",
-            temperature=0.3,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            max_tokens=500,
+        result = await _complete_structured(
+            _cache_key("fertilizers", plant_type, soil_condition, season),
+            [*_FERT_MESSAGES, {"role": "user", "content": user_prompt}],
+            _FERTILIZERS_FORMAT,
+            _FERTILIZERS_ADAPTER,
+            max_tokens=350,
         )
+        return result["fertilizers"]
 
-        fert_text = response.choices[0].message.content.strip()
-        logger.info(f"Raw fertilizer recommendations response: {fert_text}")
-
-        data = json.loads(fert_text)
-        result = [FertilizerRecommendation.model_validate(item) for item in data]
-        return result
-
-    except Exception as exc:
-        logger.error(f"Ошибка recommend_fertilizers: {exc}", exc_info=True)
+    except (OpenAIError, ValidationError) as exc:
+        logger.error("Ошибка recommend_fertilizers: %s", exc, exc_info=True)
         # Возвращаем «пустой» список с одним дефолтом
-        return [
-            FertilizerRecommendation(
-                name="Универсальное удобрение",
-                npk_ratio="NPK неизвестно",
-                frequency="раз в месяц",
-                amount="5 г",
-                organic=False,
-                price_range="от 300 ₽",
-            )
-        ]
+        return [item.model_dump() for item in _DEFAULT_FERTILIZERS]
 
 
 @function_tool
-async def recommend_tools(care_task: str, plant_size: str) -> List[ToolRecommendation]:
+async def recommend_tools(care_task: str, plant_size: str) -> List[ToolDict]:
     """
-    Инструмент для подбора инструментов для ухода. LLM возвращает строго JSON-массив:
+    Инструмент для подбора инструментов для ухода. Возвращает список объектов:
     [
       {
         "name": "...",
@@ -210,61 +400,91 @@ async def recommend_tools(care_task: str, plant_size: str) -> List[ToolRecommend
       ...
     ]
     """
-    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-
-    system_prompt = (
-        "Ты — бот, отвечающий за подбор садового инвентаря. "
-        "На вход тебе дается задача по уходу (care_task) и размер растения. "
-        "Верни строго JSON-массив из трёх объектов с ключами:\n"
-        "  name, purpose, price_range, brand, purchase_links.\n"
-        "Пример:\n"
-        "[\n"
-        "  {\"name\": \"Ножницы для обрезки\", \"purpose\": \"обрезка сухих веток\", "
-        "\"price_range\": \"500-700 ₽\", \"brand\": \"Gardena\", "
-        "\"purchase_links\": [\"Леруа Мерлен\", \"Ozon\"]},\n"
-        "  {\"name\": \"Перчатки садовые\", \"purpose\": \"защита рук\", "
-        "\"price_range\": \"200-300 ₽\", \"brand\": \"Fiskars\", "
-        "\"purchase_links\": [\"Петрович\", \"Wildberries\"]},\n"
-        "  {\"name\": \"Компостёр\", \"purpose\": \"приготовление компоста\", "
-        "\"price_range\": \"1500-2000 ₽\", \"brand\": \"BioMaster\", "
-        "\"purchase_links\": [\"Ozon\", \"Садовый центр\"]}\n"
-        "]\n"
-        "Никакого лишнего текста."
-    )
+    return await _recommend_tools(care_task, plant_size)
 
+
+async def _recommend_tools(care_task: str, plant_size: str) -> List[ToolDict]:
     user_prompt = (
         f"Задача по уходу: {care_task}.\n"
         f"Размер растения: {plant_size}.\n\n"
-        "Выведи JSON-массив."
+        "Выведи JSON с тремя инструментами."
     )
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4",
-            temperature=0.3,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            max_tokens=500,
+        result = await _complete_structured(
+            _cache_key("tools", care_task, plant_size),
+            [*_TOOLS_MESSAGES, {"role": "user", "content": user_prompt}],
+            _TOOLS_FORMAT,
+            _TOOLS_ADAPTER,
+            max_tokens=350,
         )
+        return result["tools"]
 
-        tools_text = response.choices[0].message.content.strip()
-        logger.info(f"Raw tool recommendations response: {tools_text}")
+    except (OpenAIError, ValidationError) as exc:
+        logger.error("Ошибка recommend_tools: %s", exc, exc_info=True)
+        # Возвращаем «пустой» дефолт
+        return [item.model_dump() for item in _DEFAULT_TOOLS]
 
-        data = json.loads(tools_text)
-        result = [ToolRecommendation.model_validate(item) for item in data]
-        return result
 
-    except Exception as exc:
-        logger.error(f"Ошибка recommend_tools: {exc}", exc_info=True)
-        # Возвращаем «пустой» дефолт
-        return [
-            ToolRecommendation(
-                name="Стандартные перчатки",
-                purpose="защита рук при уходе",
-                price_range="200-300 ₽",
-                brand="Generic",
-                purchase_links=["Любой садовый магазин"],
-            )
-        ]
+def _combined_care_prompt(
+    diag_json: str,
+    season: str,
+    plant_type: str,
+    soil_condition: str,
+    care_task: str,
+    plant_size: str,
+) -> List[Dict[str, str]]:
+    """Собирает один запрос, который возвращает уход, удобрения и инструменты сразу."""
+    user_prompt = (
+        f"Диагноз:\n{diag_json}\n"
+        f"Сезон: {season}.\n"
+        f"Тип растения: {plant_type}.\n"
+        f"Состояние почвы: {soil_condition}.\n"
+        f"Задача по уходу: {care_task}.\n"
+        f"Размер растения: {plant_size}.\n\n"
+        "Сформируй полный план ухода строго в формате JSON."
+    )
+
+    return [*_PLAN_MESSAGES, {"role": "user", "content": user_prompt}]
+
+
+@function_tool
+async def generate_full_care_plan(
+    plant_id: str,
+    diagnosis: DiagnosisInput,
+    season: str,
+    plant_type: str,
+    soil_condition: str,
+    care_task: str,
+    plant_size: str,
+) -> CarePlanDict:
+    """
+    Инструмент для полного плана ухода: рекомендации по уходу, удобрения и инструменты
+    за один запрос к LLM. Возвращаемый JSON строго в формате:
+    {
+      "care": {"watering": "...", "lighting": "...", "soil": "...", "seasonal_tips": ["..."]},
+      "fertilizers": [{...}, ...],
+      "tools": [{...}, ...]
+    }
+    """
+    diag_json = diagnosis.model_dump_json()
+
+    try:
+        return await _complete_structured(
+            _cache_key("plan", diag_json, season, plant_type, soil_condition, care_task, plant_size),
+            _combined_care_prompt(diag_json, season, plant_type, soil_condition, care_task, plant_size),
+            _CARE_PLAN_FORMAT,
+            _CARE_PLAN_ADAPTER,
+            max_tokens=1500,
+        )
+
+    except (OpenAIError, ValidationError) as exc:
+        logger.error("Ошибка generate_full_care_plan: %s", exc, exc_info=True)
+
+    # Запасной путь: три отдельных запроса параллельно, каждый со своим дефолтом
+    care, fertilizers, tools = await asyncio.gather(
+        _generate_care_instructions(plant_id, diagnosis, season),
+        _recommend_fertilizers(plant_type, soil_condition, season),
+        _recommend_tools(care_task, plant_size),
+    )
+    return CarePlanDict(care=care, fertilizers=fertilizers, tools=tools)
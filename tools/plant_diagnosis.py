@@ -1,30 +1,83 @@
 """Plant diagnosis tools."""
 
+import asyncio
 import base64
+import hashlib
+import io
 import logging
-import re
-import json
-from typing import Dict, Optional, List
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Final, Literal, Optional, List, Tuple
 
-from agents import function_tool
-from pydantic import BaseModel, Field, ConfigDict
-from openai import AsyncOpenAI
+from PIL import Image, features
 
-from config.settings import settings
+from agents import RunContextWrapper, function_tool
+from openai import OpenAIError
+from pydantic import BaseModel, Field, ConfigDict, field_validator
+
+from services.cache import cache_get, cache_set
+from services.openai_client import (
+    TOOL_TIMEOUT,
+    batch_timeout,
+    get_openai_client,
+    json_schema_format,
+    openai_request,
+    priority_extra_body,
+)
 
 logger = logging.getLogger(__name__)
 
+# Повторно загруженные фото не отправляем в LLM: вид растения кешируется по хешу изображения
+_SPECIES_CACHE_TTL = 30 * 24 * 3600
+
+# detail="low" API обрабатывает в 512x512, поэтому больше отправлять бессмысленно;
+# для "high" оставляем запас под тайлы 512px
+_VISION_MAX_DIM = {"low": 512, "high": 1024}
+_VISION_JPEG_QUALITY = 80
+# WebP при сопоставимом качестве примерно на треть меньше JPEG; если Pillow собран
+# без libwebp, остаёмся на JPEG
+_VISION_WEBP = features.check("webp")
+_VISION_WEBP_QUALITY = 75
+
+# Ресайз и base64 картинки — CPU-bound; Pillow отпускает GIL, поэтому хватает потоков,
+# а цикл событий тем временем обслуживает других пользователей
+_PREPROCESS_POOL = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="vision-prep")
+
+# Сколько фото максимум отправляем одним vision-запросом
+_MAX_BATCH_IMAGES = 10
+
+# Формат ответа задаёт strict-схема в response_format, в промптах его не дублируем
+_SYS_DIAGNOSIS: Final[str] = (
+    "Ты — эксперт по фитодиагностике. "
+    "Проанализируй изображение растения и верни JSON по заданной схеме."
+)
+_SYS_DIAGNOSIS_BATCH: Final[str] = (
+    "Ты — эксперт по фитодиагностике. "
+    "Проанализируй каждое изображение растения отдельно и верни диагнозы по заданной схеме "
+    "в том же порядке, в котором идут фото."
+)
+_SYS_IDENTIFY: Final[str] = (
+    "Ты — эксперт по ботанике. "
+    "Определи вид растения по изображению и верни JSON по заданной схеме."
+)
+
 
 class DiagnosisResult(BaseModel):
-    model_config = ConfigDict(extra="forbid")  # ❗ обязательно
+    model_config = ConfigDict(frozen=True, extra="ignore")  # ответ LLM: лишние поля отбрасываем
     health_score: float = Field(description="Индекс здоровья растения (1-10)")
     issues: list[str] = Field(description="Список обнаруженных проблем")
-    severity: str = Field(description="Уровень тяжести: mild, moderate, severe")
+    severity: Literal["mild", "moderate", "severe"] = Field(description="Уровень тяжести: mild, moderate, severe")
     confidence: float = Field(description="Достоверность диагноза (0-1)")
     recommendations: list[str] = Field(description="Список рекомендаций по первичным действиям")
 
+    @field_validator("severity", mode="before")
+    @classmethod
+    def normalize_severity(cls, v):
+        """LLM иногда пишет "Moderate" — приводим к значениям из ck_diagnosis_severity."""
+        return v.strip().lower() if isinstance(v, str) else v
+
 class PlantIdentification(BaseModel):
-    model_config = ConfigDict(extra="forbid")  # ❗ обязательно
+    model_config = ConfigDict(frozen=True, extra="ignore")  # ответ LLM: лишние поля отбрасываем
     species: str = Field(description="Название вида/таксона (вида)")
     common_name: str = Field(description="Распространенное название")
     scientific_name: str = Field(description="Научное латинское название")
@@ -33,12 +86,95 @@ class PlantIdentification(BaseModel):
 
 
 
+class DiagnosisList(BaseModel):
+    # Strict-режим требует объект в корне схемы, поэтому список обёрнут
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    diagnoses: list[DiagnosisResult] = Field(description="Диагнозы по каждому фото в порядке загрузки")
+
+
+# Strict structured outputs: ответ гарантированно соответствует схеме модели
+_DIAGNOSIS_FORMAT = json_schema_format("DiagnosisResult", DiagnosisResult)
+_DIAGNOSIS_LIST_FORMAT = json_schema_format("DiagnosisList", DiagnosisList)
+
+# Максимально нейтральный «пустой» диагноз; модель frozen, поэтому экземпляр общий
+_FALLBACK_DIAGNOSIS = DiagnosisResult(
+    health_score=5.0,
+    issues=[],
+    severity="moderate",
+    confidence=0.0,
+    recommendations=["Не удалось провести точную диагностику. Попробуйте сделать более чёткое фото и повторить запрос."],
+)
+_IDENTIFICATION_FORMAT = json_schema_format("PlantIdentification", PlantIdentification)
+
+
+def _context_image(ctx: RunContextWrapper[Dict]) -> bytes:
+    """Достаёт изображение пользователя из контекста запуска агента."""
+    image_data = (ctx.context or {}).get("image")
+    if not image_data:
+        raise ValueError("В контексте запуска нет изображения")
+    return image_data
+
+
+def _context_images(ctx: RunContextWrapper[Dict]) -> List[bytes]:
+    """Достаёт все фото пользователя из контекста: список "images" или одиночное "image"."""
+    context = ctx.context or {}
+    images = context.get("images") or ([context["image"]] if context.get("image") else [])
+    if not images:
+        raise ValueError("В контексте запуска нет изображений")
+    return list(images[:_MAX_BATCH_IMAGES])
+
+
+def _prepare_vision_image(image_data: bytes, max_dim: int = 1024) -> Tuple[bytes, str]:
+    """
+    Уменьшает изображение до max_dim по длинной стороне и перекодирует в WebP (или JPEG).
+    Возвращает байты и MIME-тип для data URL.
+    """
+    image = Image.open(io.BytesIO(image_data))
+    # Уже подходящий JPEG (после ImageProcessor) не перекодируем повторно
+    if image.format == "JPEG" and max(image.size) <= max_dim:
+        return image_data, "image/jpeg"
+
+    image = image.convert("RGB")
+    image.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    if _VISION_WEBP:
+        image.save(output, format="WEBP", quality=_VISION_WEBP_QUALITY, method=4)
+        return output.getvalue(), "image/webp"
+    image.save(output, format="JPEG", quality=_VISION_JPEG_QUALITY)
+    return output.getvalue(), "image/jpeg"
+
+
+def _vision_data_url(image_data: bytes, max_dim: int) -> str:
+    """Готовит картинку для vision-запроса и кодирует её в data URL."""
+    prepared, mime_type = _prepare_vision_image(image_data, max_dim)
+    b64 = base64.b64encode(prepared).decode("utf-8")
+    return f"data:{mime_type};base64,{b64}"
+
+
+async def _vision_user_content(
+    ctx: RunContextWrapper[Dict], images: List[bytes], text: str
+) -> List[Dict[str, Any]]:
+    """
+    Собирает сообщение пользователя: текст и по части image_url на каждую картинку.
+    По умолчанию detail="low"; "high" — только если контекст просит детальный осмотр.
+    """
+    detail = "high" if (ctx.context or {}).get("image_detail") == "high" else "low"
+    loop = asyncio.get_running_loop()
+    data_urls = await asyncio.gather(*(
+        loop.run_in_executor(_PREPROCESS_POOL, _vision_data_url, image_data, _VISION_MAX_DIM[detail])
+        for image_data in images
+    ))
+    return [{"type": "text", "text": text}] + [
+        {"type": "image_url", "image_url": {"url": data_url, "detail": detail}}
+        for data_url in data_urls
+    ]
+
+
 @function_tool
-async def diagnose_plant_photo(
-    image_data: bytes,
-) -> DiagnosisResult:
+async def diagnose_plant_photo(ctx: RunContextWrapper[Dict]) -> DiagnosisResult:
     """
     Инструмент для диагностики растения по загруженной фотографии.
+    Фотография берётся из контекста запуска, передавать её в аргументах не нужно.
     Ожидает, что LLM вернет строго JSON следующего вида:
     {
       "health_score": <float 1-10>,
@@ -48,65 +184,88 @@ async def diagnose_plant_photo(
       "recommendations": ["действие1", "действие2", ...]
     }
     """
-    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-
-    # Преобразуем байты картинки в base64 и встраиваем в запрос
-    b64 = base64.b64encode(image_data).decode("utf-8")
-    image_str = f"data:image/jpeg;base64,{b64}"
-
-    system_prompt = (
-        "Ты — эксперт по фитодиагностике. "
-        "Твоя задача — проанализировать изображение растения и вернуть результат строго в формате JSON.\n"
-        "JSON-объект должен содержать поля:\n"
-        "  - health_score: число от 1 до 10 (чем выше — тем лучше),\n"
-        "  - issues: массив строк (описание каждой обнаруженной проблемы),\n"
-        "  - severity: один из вариантов \"mild\", \"moderate\", \"severe\",\n"
-        "  - confidence: число от 0 до 1,\n"
-        "  - recommendations: массив строк (рекомендации по первоочередным действиям).\n"
-        "Никакого другого текста — только чистый JSON."
-    )
-
-    user_prompt = (
-        f"Вот изображение растения:\n{image_str}\n\n"
-        "Проанализируй его и верни JSON."
-    )
+    client = get_openai_client()
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4-vision-preview",
-            temperature=0.2,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            max_tokens=800,
+        # Картинка уходит отдельной частью сообщения, а не base64-текстом в промпте
+        user_content = await _vision_user_content(
+            ctx, [_context_image(ctx)], "Вот изображение растения. Проанализируй его и верни JSON."
         )
 
-        diagnosis_text = response.choices[0].message.content.strip()
-        logger.info(f"Raw diagnose response: {diagnosis_text}")
+        async with openai_request():
+            response = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                temperature=0.2,
+                messages=[
+                    {"role": "system", "content": _SYS_DIAGNOSIS},
+                    {"role": "user", "content": user_content},
+                ],
+                response_format=_DIAGNOSIS_FORMAT,
+                max_tokens=300,
+                timeout=TOOL_TIMEOUT,
+                extra_body=priority_extra_body(),
+            )
 
-        # Парсим JSON
-        data = json.loads(diagnosis_text)
-        # Валидируем через Pydantic
-        result = DiagnosisResult.model_validate(data)
-        return result
+        diagnosis_text = response.choices[0].message.content
+        logger.debug("Raw diagnose response: %s", diagnosis_text)
 
-    except Exception as exc:
-        logger.error(f"Ошибка diagnose_plant_photo: {exc}", exc_info=True)
-        # Возвращаем максимально нейтральный «пустой» диагноз
-        return DiagnosisResult(
-            health_score=5.0,
-            issues=[],
-            severity="moderate",
-            confidence=0.0,
-            recommendations=["Не удалось провести точную диагностику. Попробуйте сделать более чёткое фото и повторить запрос."],
+        # Парсим и валидируем JSON сразу в pydantic-core, без промежуточного dict
+        return DiagnosisResult.model_validate_json(diagnosis_text)
+
+    except (OpenAIError, ValueError, OSError) as exc:
+        logger.error("Ошибка diagnose_plant_photo: %s", exc, exc_info=True)
+        return _FALLBACK_DIAGNOSIS
+
+
+@function_tool
+async def diagnose_plant_photos(ctx: RunContextWrapper[Dict]) -> List[DiagnosisResult]:
+    """
+    Инструмент для диагностики нескольких фотографий одним запросом к LLM.
+    Фотографии берутся из контекста запуска, передавать их в аргументах не нужно.
+    Возвращает по одному диагнозу (как у diagnose_plant_photo) на каждое фото в порядке загрузки.
+    """
+    client = get_openai_client()
+    images: List[bytes] = []
+
+    try:
+        images = _context_images(ctx)
+        # Все фото уходят в одном сообщении: одна задержка до первого токена вместо N
+        user_content = await _vision_user_content(
+            ctx, images, f"Вот {len(images)} фото растений. Проанализируй каждое и верни JSON."
         )
 
+        async with openai_request():
+            response = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                temperature=0.2,
+                messages=[
+                    {"role": "system", "content": _SYS_DIAGNOSIS_BATCH},
+                    {"role": "user", "content": user_content},
+                ],
+                response_format=_DIAGNOSIS_LIST_FORMAT,
+                max_tokens=300 * len(images),
+                timeout=batch_timeout(len(images)),
+                extra_body=priority_extra_body(),
+            )
+
+        diagnoses_text = response.choices[0].message.content
+        logger.debug("Raw batch diagnose response: %s", diagnoses_text)
+
+        diagnoses = DiagnosisList.model_validate_json(diagnoses_text).diagnoses
+        if len(diagnoses) != len(images):
+            raise ValueError(f"Ожидалось {len(images)} диагнозов, получено {len(diagnoses)}")
+        return diagnoses
+
+    except (OpenAIError, ValueError, OSError) as exc:
+        logger.error("Ошибка diagnose_plant_photos: %s", exc, exc_info=True)
+        return [_FALLBACK_DIAGNOSIS] * max(len(images), 1)
+
 
 @function_tool
-async def identify_plant_species(image_data: bytes) -> PlantIdentification:
+async def identify_plant_species(ctx: RunContextWrapper[Dict]) -> PlantIdentification:
     """
     Инструмент для идентификации вида растения по фотографии.
+    Фотография берётся из контекста запуска, передавать её в аргументах не нужно.
     LLM должен вернуть строго JSON:
     {
     "species": "<название вида>",
@@ -116,48 +275,43 @@ async def identify_plant_species(image_data: bytes) -> PlantIdentification:
       "alternatives": ["вариант1", "вариант2", ...]
     }
     """
-    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-
-    b64 = base64.b64encode(image_data).decode("utf-8")
-    image_str = f"data:image/jpeg;base64,{b64}"
-
-    system_prompt = (
-        "Ты — эксперт по ботанике. "
-        "Твоя задача — по изображению растения определить вид и вернуть JSON.\n"
-        "Формат JSON:\n"
-        "  - species: строка (название вида),\n"
-        "  - common_name: строка (распространенное название),\n"
-        "  - scientific_name: строка (латинское название),\n"
-        "  - confidence: число от 0 до 1,\n"
-        "  - alternatives: массив строк (альтернативные близкие виды).\n"
-        "Никакого другого текста — только JSON."
-    )
-
-    user_prompt = (
-        f"Вот изображение растения:\n{image_str}\n\n"
-        "Определи вид и верни JSON."
-    )
+    client = get_openai_client()
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4-vision-preview",
-            temperature=0.2,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            max_tokens=600,
+        image_data = _context_image(ctx)
+        cache_key = f"plant:species:{hashlib.blake2b(image_data, digest_size=16).hexdigest()}"
+        cached = await cache_get(cache_key)
+        if cached is not None:
+            return PlantIdentification.model_validate_json(cached)
+
+        user_content = await _vision_user_content(
+            ctx, [image_data], "Вот изображение растения. Определи вид и верни JSON."
         )
 
-        ident_text = response.choices[0].message.content.strip()
-        logger.info(f"Raw identify response: {ident_text}")
+        async with openai_request():
+            response = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                temperature=0.2,
+                messages=[
+                    {"role": "system", "content": _SYS_IDENTIFY},
+                    {"role": "user", "content": user_content},
+                ],
+                response_format=_IDENTIFICATION_FORMAT,
+                max_tokens=250,
+                timeout=TOOL_TIMEOUT,
+                extra_body=priority_extra_body(),
+            )
+
+        ident_text = response.choices[0].message.content
+        logger.debug("Raw identify response: %s", ident_text)
 
-        data = json.loads(ident_text)
-        result = PlantIdentification.model_validate(data)
+        result = PlantIdentification.model_validate_json(ident_text)
+        # В кеш кладём уже проверенный ответ как есть, без повторной сериализации
+        await cache_set(cache_key, ident_text, _SPECIES_CACHE_TTL)
         return result
 
-    except Exception as exc:
-        logger.error(f"Ошибка identify_plant_species: {exc}", exc_info=True)
+    except (OpenAIError, ValueError, OSError) as exc:
+        logger.error("Ошибка identify_plant_species: %s", exc, exc_info=True)
         # Пустая заглушка
         return PlantIdentification(
             species="Неизвестно",
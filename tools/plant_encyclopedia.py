@@ -1,27 +1,91 @@
+import asyncio
+import hashlib
 import logging
 import json
-from typing import Dict, List, Optional
+from typing import Dict, Final, List, Optional
 from datetime import datetime
 
 from agents import function_tool
-from pydantic import BaseModel, Field, ConfigDict
-from openai import AsyncOpenAI
+from openai import OpenAIError
+from pydantic import BaseModel, Field, ConfigDict, ValidationError
 
-from config.settings import settings
+from services.cache import cache_get, cache_set, get_redis
+from services.openai_client import TOOL_TIMEOUT, batch_timeout, get_openai_client, json_schema_format, openai_request
 from services.plant_knowledge import PlantKnowledgeBase
 
 logger = logging.getLogger(__name__)
 
+# Справка о виде и расписание полива зависят от небольшого набора входов; ответы LLM
+# кешируем в Redis на 30 дней, а сезон входит в ключ, чтобы совет не устаревал
+_PLANT_INFO_CACHE_TTL = 30 * 24 * 3600
+
+# Сезон по номеру месяца (индекс = month - 1) вместо цепочки if на каждый вызов
+_SEASON_BY_MONTH: Final[tuple] = (
+    "зима", "зима", "весна", "весна", "весна", "лето",
+    "лето", "лето", "осень", "осень", "осень", "зима",
+)
+
+# Расписание полива для растений из локальной базы считаем формулой, без LLM:
+# объём зависит от горшка, интервал — от базового интервала вида, сезона и влажности
+_POT_ML: Final[Dict[str, int]] = {
+    "small": 150, "маленький": 150,
+    "medium": 300, "средний": 300,
+    "large": 500, "большой": 500,
+}
+_SEASON_MULT: Final[Dict[str, float]] = {"зима": 1.4, "весна": 1.0, "лето": 0.7, "осень": 1.1}
+_WATERING_INDICATORS: Final[tuple] = (
+    "Верхний слой почвы (2–3 см) сухой",
+    "Горшок стал заметно легче",
+    "Листья слегка поникли",
+)
+
+# Поля ухода из локальной базы (care) и соответствующие им поля справки
+_KB_CARE_FIELDS: Final[Dict[str, str]] = {
+    "water": "watering",
+    "light": "lighting",
+    "fertilizer": "fertilizing",
+    "temperature": "temperature_range",
+}
+# Текстовые поля справки и их значения-заглушки: по ним считаем полноту локальной записи
+_TEXT_FIELDS: Final[tuple] = (
+    "common_name", "scientific_name", "family", "origin", "description",
+    "watering", "lighting", "fertilizing", "temperature_range", "propagation",
+)
+_PLACEHOLDERS: Final[frozenset] = frozenset({"", "Неизвестно", "Нет доступной информации."})
+# Если локально заполнено не меньше этой доли полей, отвечаем сразу, а LLM дополняет кеш в фоне
+_LOCAL_COMPLETENESS: Final[float] = 0.8
+
+# Фоновые обновления кеша по ключу: держим ссылки на задачи и не дублируем их
+_REFRESH_TASKS: Dict[str, asyncio.Task] = {}
+
+# Формат ответа задаёт strict-схема в response_format, в промптах его не дублируем
+_SYS_ENCYCLOPEDIA: Final[str] = (
+    "Ты — бот-энциклопедия по комнатным растениям. "
+    "Тебе дано частичное описание растения (в JSON). "
+    "Дополни недостающие текстовые поля и watering_schedule и верни JSON по заданной схеме."
+)
+_SYS_ENCYCLOPEDIA_BATCH: Final[str] = (
+    "Ты — бот-энциклопедия по комнатным растениям. "
+    "Тебе дан JSON-массив частичных описаний растений. "
+    "Дополни недостающие текстовые поля и watering_schedule у каждого и верни их "
+    "по заданной схеме в том же порядке."
+)
+_SYS_WATERING: Final[str] = (
+    "Ты — бот, рассчитывающий расписание полива для дома "
+    "по plant_id, размеру горшка, влажности почвы (%) и сезону. "
+    "Верни JSON по заданной схеме."
+)
+
 
 class WateringSchedule(BaseModel):
-    model_config = ConfigDict(extra="forbid")  # 💥 обязательный параметр
+    model_config = ConfigDict(frozen=True, extra="ignore")  # ответ LLM: лишние поля отбрасываем
     frequency_days: int = Field(description="Интервал полива (в днях)")
     amount_ml: int = Field(description="Количество воды (в мл)")
     indicators: List[str] = Field(description="Признаки, указывающие на необходимость полива")
 
 
 class PlantInfo(BaseModel):
-    model_config = ConfigDict(extra="forbid")  # 💥 обязательный параметр
+    model_config = ConfigDict(frozen=True, extra="ignore")  # ответ LLM: лишние поля отбрасываем
     common_name: str = Field(description="Распространенное название растения")
     scientific_name: str = Field(description="Латинское название растения")
     family: str = Field(description="Ботаническое семейство")
@@ -37,38 +101,28 @@ class PlantInfo(BaseModel):
     watering_schedule: WateringSchedule = Field(description="Структура с расписанием полива")
 
 
-@function_tool
-async def get_plant_encyclopedia(plant_name: str) -> PlantInfo:
-    """
-    Инструмент для получения справочной информации о растении.
-    Сначала проверяем локальную БД, затем, при необходимости, дополняем через LLM.
-    LLM должен вернуть JSON вида:
-    {
-      "common_name": "...",
-      "scientific_name": "...",
-      "family": "...",
-      "origin": "...",
-      "description": "...",
-      "difficulty": "easy"|"medium"|"hard",
-      "watering": "...",
-      "lighting": "...",
-      "fertilizing": "...",
-      "temperature_range": "...",
-      "propagation": "...",
-      "pet_friendly": <true|false>,
-      "watering_schedule": {
-        "frequency_days": <int>,
-        "amount_ml": <int>,
-        "indicators": ["...", "..."]
-      }
-    }
-    """
-    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+class PlantInfoList(BaseModel):
+    # Strict-режим требует объект в корне схемы, поэтому список обёрнут
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    plants: List[PlantInfo] = Field(description="Справки по растениям в порядке запроса")
+
+
+# Strict structured outputs: ответ гарантированно соответствует схеме модели
+_PLANT_INFO_FORMAT = json_schema_format("PlantInfo", PlantInfo)
+_PLANT_INFO_LIST_FORMAT = json_schema_format("PlantInfoList", PlantInfoList)
+_WATERING_FORMAT = json_schema_format("WateringSchedule", WateringSchedule)
 
+
+def _current_season() -> str:
+    """Текущий сезон по дате сервера. Если нужен локальный — сюда передавать timezone пользователя."""
+    return _SEASON_BY_MONTH[datetime.now().month - 1]
+
+
+def _partial_plant_info(plant_name: str) -> Dict:
+    """Скелет справки с дефолтами, дополненный данными из локальной БД."""
     # Попытка получить данные из локальной БД
-    local_info = await PlantKnowledgeBase.get_plant_info(plant_name)
+    local_info = PlantKnowledgeBase.get_plant_info(plant_name)
 
-    # Заведем «скелет» ответа, чтобы везде были дефолты
     result_dict: Dict = {
         "common_name": plant_name,
         "scientific_name": "Неизвестно",
@@ -94,47 +148,111 @@ async def get_plant_encyclopedia(plant_name: str) -> PlantInfo:
         for key, value in local_info.items():
             if key in result_dict:
                 result_dict[key] = value
+        care = local_info.get("care", {})
+        for kb_key, key in _KB_CARE_FIELDS.items():
+            if care.get(kb_key):
+                result_dict[key] = care[kb_key]
+        if care.get("water_interval_days"):
+            result_dict["watering_schedule"]["frequency_days"] = care["water_interval_days"]
 
-    # Теперь формируем запрос к LLM, чтобы дополнить недостающие поля
-    # Определим текущий сезон по дате сервера (UTC). Если нужно брать локально по пользователю — сюда передавать его timezone.
-    month = datetime.now().month
-    if month in (12, 1, 2):
-        season = "зима"
-    elif month in (3, 4, 5):
-        season = "весна"
-    elif month in (6, 7, 8):
-        season = "лето"
-    else:
-        season = "осень"
-
-    system_prompt = (
-        "Ты — бот-энциклопедия по комнатным растениям. "
-        "Тебе дано частичное описание растения (в JSON) с некоторыми полями. "
-        "Твоя задача — дополнить недостающие текстовые поля и поля watering_schedule, "
-        "вернув строго JSON точно по схеме PlantInfo.\n"
-        "Формат ответа строго JSON:\n"
-        "{\n"
-        '  "common_name": "...",\n'
-        '  "scientific_name": "...",\n'
-        '  "family": "...",\n'
-        '  "origin": "...",\n'
-        '  "description": "...",\n'
-        '  "difficulty": "easy"|"medium"|"hard",\n'
-        '  "watering": "...",\n'
-        '  "lighting": "...",\n'
-        '  "fertilizing": "...",\n'
-        '  "temperature_range": "...",\n'
-        '  "propagation": "...",\n'
-        '  "pet_friendly": <true|false>,\n'
-        '  "watering_schedule": {\n'
-        '    "frequency_days": <int>,\n'
-        '    "amount_ml": <int>,\n'
-        '    "indicators": ["...", "..."]\n'
-        "  }\n"
-        "}\n"
-        "Никакого дополнительного текста."
+    return result_dict
+
+
+def _completeness(result_dict: Dict) -> float:
+    """Доля текстовых полей справки, заполненных не заглушкой."""
+    filled = sum(1 for key in _TEXT_FIELDS if result_dict[key] not in _PLACEHOLDERS)
+    return filled / len(_TEXT_FIELDS)
+
+
+async def _complete_plant_info(cache_key: str, user_prompt: str) -> PlantInfo:
+    """Дополняет справку через LLM и кладёт ответ в кеш."""
+    async with openai_request():
+        response = await get_openai_client().chat.completions.create(
+            model="gpt-4.1-mini",
+            temperature=0.3,
+            messages=[
+                {"role": "system", "content": _SYS_ENCYCLOPEDIA},
+                {"role": "user", "content": user_prompt},
+            ],
+            response_format=_PLANT_INFO_FORMAT,
+            max_tokens=800,
+            timeout=TOOL_TIMEOUT,
+        )
+
+    info_text = response.choices[0].message.content
+    logger.debug("Raw encyclopedia response: %s", info_text)
+
+    result = PlantInfo.model_validate_json(info_text)
+    await cache_set(cache_key, info_text, _PLANT_INFO_CACHE_TTL)
+    return result
+
+
+async def _refresh_plant_info(cache_key: str, user_prompt: str) -> None:
+    """Фоновое дополнение справки: ошибки только логируем, пользователь уже получил ответ."""
+    try:
+        await _complete_plant_info(cache_key, user_prompt)
+    except (OpenAIError, ValidationError) as exc:
+        logger.warning("Не удалось обновить справку в фоне: %s", exc)
+    finally:
+        _REFRESH_TASKS.pop(cache_key, None)
+
+
+def _local_watering_schedule(
+    plant_id: str, pot_size: str, humidity: float, season: str
+) -> Optional[WateringSchedule]:
+    """Считает полив по локальной базе; None, если вида или размера горшка в ней нет."""
+    amount_ml = _POT_ML.get(pot_size.strip().lower())
+    info = PlantKnowledgeBase.get_plant_info(plant_id)
+    base_days = info.get("care", {}).get("water_interval_days") if info else None
+    if amount_ml is None or base_days is None:
+        return None
+
+    frequency_days = max(2, round(base_days * _SEASON_MULT[season] * (1 + (humidity - 40) / 100)))
+    return WateringSchedule(
+        frequency_days=frequency_days,
+        amount_ml=amount_ml,
+        indicators=list(_WATERING_INDICATORS),
     )
 
+
+def _cache_key(prefix: str, *parts) -> str:
+    """Ключ кеша: префикс и blake2b от нормализованных входных данных."""
+    raw = "\x1f".join(str(part).strip().lower() for part in parts)
+    return f"{prefix}:{hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()}"
+
+
+@function_tool
+async def get_plant_encyclopedia(plant_name: str) -> PlantInfo:
+    """
+    Инструмент для получения справочной информации о растении.
+    Сначала проверяем локальную БД, затем, при необходимости, дополняем через LLM.
+    LLM должен вернуть JSON вида:
+    {
+      "common_name": "...",
+      "scientific_name": "...",
+      "family": "...",
+      "origin": "...",
+      "description": "...",
+      "difficulty": "easy"|"medium"|"hard",
+      "watering": "...",
+      "lighting": "...",
+      "fertilizing": "...",
+      "temperature_range": "...",
+      "propagation": "...",
+      "pet_friendly": <true|false>,
+      "watering_schedule": {
+        "frequency_days": <int>,
+        "amount_ml": <int>,
+        "indicators": ["...", "..."]
+      }
+    }
+    Если локальная запись почти полная, она возвращается сразу, а LLM обновляет кеш в фоне.
+    """
+    result_dict = _partial_plant_info(plant_name)
+
+    # Теперь формируем запрос к LLM, чтобы дополнить недостающие поля
+    season = _current_season()
+
     partial_json = json.dumps(result_dict, ensure_ascii=False)
 
     user_prompt = (
@@ -144,28 +262,91 @@ async def get_plant_encyclopedia(plant_name: str) -> PlantInfo:
     )
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4.1-mini",
-            temperature=0.3,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            max_tokens=1000,
-        )
+        cache_key = _cache_key("plant:info", plant_name, season)
+        cached = await cache_get(cache_key)
+        if cached is not None:
+            return PlantInfo.model_validate_json(cached)
 
-        info_text = response.choices[0].message.content.strip()
-        logger.info(f"Raw encyclopedia response: {info_text}")
+        if _completeness(result_dict) >= _LOCAL_COMPLETENESS:
+            # Фоновое дополнение имеет смысл только если его результат есть куда положить
+            if get_redis() is not None and cache_key not in _REFRESH_TASKS:
+                _REFRESH_TASKS[cache_key] = asyncio.create_task(_refresh_plant_info(cache_key, user_prompt))
+            return PlantInfo.model_validate(result_dict)
 
-        data = json.loads(info_text)
-        return PlantInfo.model_validate(data)
+        return await _complete_plant_info(cache_key, user_prompt)
 
-    except Exception as exc:
-        logger.error(f"Ошибка get_plant_encyclopedia: {exc}", exc_info=True)
+    except (OpenAIError, ValidationError) as exc:
+        logger.error("Ошибка get_plant_encyclopedia: %s", exc, exc_info=True)
         # Возвращаем тот скелет, что был
         return PlantInfo.model_validate(result_dict)
 
 
+@function_tool
+async def get_plant_encyclopedia_batch(plant_names: List[str]) -> List[PlantInfo]:
+    """
+    Инструмент для получения справок сразу о нескольких растениях.
+    Растения, которых нет в кеше, дополняются через LLM одним запросом.
+    Возвращает список справок (как у get_plant_encyclopedia) в порядке plant_names.
+    """
+    season = _current_season()
+    cache_keys = [_cache_key("plant:info", name, season) for name in plant_names]
+    results: List[Optional[PlantInfo]] = [None] * len(plant_names)
+
+    try:
+        cached = await asyncio.gather(*(cache_get(key) for key in cache_keys))
+        missing = []
+        for index, value in enumerate(cached):
+            if value is None:
+                missing.append(index)
+            else:
+                results[index] = PlantInfo.model_validate_json(value)
+
+        if missing:
+            partial_json = json.dumps(
+                [_partial_plant_info(plant_names[index]) for index in missing], ensure_ascii=False
+            )
+            user_prompt = (
+                f"Частичные данные:\n{partial_json}\n"
+                f"Текущий сезон: {season}.\n\n"
+                "Дополни каждое растение и верни полный JSON."
+            )
+
+            async with openai_request():
+                response = await get_openai_client().chat.completions.create(
+                    model="gpt-4.1-mini",
+                    temperature=0.3,
+                    messages=[
+                        {"role": "system", "content": _SYS_ENCYCLOPEDIA_BATCH},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    response_format=_PLANT_INFO_LIST_FORMAT,
+                    max_tokens=800 * len(missing),
+                    timeout=batch_timeout(len(missing)),
+                )
+
+            info_text = response.choices[0].message.content
+            logger.debug("Raw batch encyclopedia response: %s", info_text)
+
+            plants = PlantInfoList.model_validate_json(info_text).plants
+            if len(plants) != len(missing):
+                raise ValueError(f"Ожидалось {len(missing)} справок, получено {len(plants)}")
+            for index, info in zip(missing, plants):
+                results[index] = info
+            await asyncio.gather(*(
+                cache_set(cache_keys[index], info.model_dump_json(), _PLANT_INFO_CACHE_TTL)
+                for index, info in zip(missing, plants)
+            ))
+
+    except (OpenAIError, ValueError) as exc:
+        logger.error("Ошибка get_plant_encyclopedia_batch: %s", exc, exc_info=True)
+
+    # Для того, что не удалось получить, возвращаем скелет из локальной БД
+    return [
+        info if info is not None else PlantInfo.model_validate(_partial_plant_info(name))
+        for name, info in zip(plant_names, results)
+    ]
+
+
 @function_tool
 async def calculate_watering_schedule(
     plant_id: str,
@@ -173,37 +354,22 @@ async def calculate_watering_schedule(
     humidity: float,
 ) -> WateringSchedule:
     """
-    Инструмент для расчёта расписания полива. Возвращает строго JSON вида:
+    Инструмент для расчёта расписания полива.
+    Для растений из локальной базы считается формулой, LLM вызывается только для остальных.
+    Возвращает строго JSON вида:
     {
       "frequency_days": <int>,
       "amount_ml": <int>,
       "indicators": ["...", "..."]
     }
     """
-    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-
-    # Определяем текущий сезон
-    month = datetime.now().month
-    if month in (12, 1, 2):
-        season = "зима"
-    elif month in (3, 4, 5):
-        season = "весна"
-    elif month in (6, 7, 8):
-        season = "лето"
-    else:
-        season = "осень"
-
-    system_prompt = (
-        "Ты — бот, рассчитывающий расписание полива для дома. "
-        "Тебе даны plant_id, размер горшка (pot_size), процент влажности почвы (humidity) и текущий сезон. "
-        "Верни строго JSON:\n"
-        "{\n"
-        '  "frequency_days": <целое число>,\n'
-        '  "amount_ml": <целое число>,\n'
-        '  "indicators": ["строка1", "строка2"]\n'
-        "}\n"
-        "Никакого дополнительного текста."
-    )
+    season = _current_season()
+
+    local = _local_watering_schedule(plant_id, pot_size, humidity, season)
+    if local is not None:
+        return local
+
+    client = get_openai_client()
 
     user_prompt = (
         f"Plant ID: {plant_id}.\n"
@@ -214,24 +380,33 @@ async def calculate_watering_schedule(
     )
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4.1-mini",
-            temperature=0.3,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            max_tokens=500,
-        )
+        cache_key = _cache_key("plant:watering", plant_id, pot_size, round(humidity, 1), season)
+        cached = await cache_get(cache_key)
+        if cached is not None:
+            return WateringSchedule.model_validate_json(cached)
+
+        async with openai_request():
+            response = await client.chat.completions.create(
+                model="gpt-4.1-mini",
+                temperature=0.3,
+                messages=[
+                    {"role": "system", "content": _SYS_WATERING},
+                    {"role": "user", "content": user_prompt},
+                ],
+                response_format=_WATERING_FORMAT,
+                max_tokens=200,
+                timeout=TOOL_TIMEOUT,
+            )
 
-        schedule_text = response.choices[0].message.content.strip()
-        logger.info(f"Raw watering schedule response: {schedule_text}")
+        schedule_text = response.choices[0].message.content
+        logger.debug("Raw watering schedule response: %s", schedule_text)
 
-        data = json.loads(schedule_text)
-        return WateringSchedule.model_validate(data)
+        result = WateringSchedule.model_validate_json(schedule_text)
+        await cache_set(cache_key, schedule_text, _PLANT_INFO_CACHE_TTL)
+        return result
 
-    except Exception as exc:
-        logger.error(f"Ошибка calculate_watering_schedule: {exc}", exc_info=True)
+    except (OpenAIError, ValidationError) as exc:
+        logger.error("Ошибка calculate_watering_schedule: %s", exc, exc_info=True)
         # Дефолтное расписание
         return WateringSchedule(
             frequency_days=7,
@@ -2,34 +2,220 @@
 
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict
+from datetime import datetime, timedelta, timezone
+from typing import Final, List, Literal, Optional, Dict
 
 from agents import function_tool
-from pydantic import BaseModel, Field, ConfigDict
-from sqlalchemy import select, desc
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, field_validator
+from sqlalchemy import String, cast, desc, func, insert, literal, literal_column, select, update
+from sqlalchemy.dialects.postgresql import distinct_on, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from config.settings import settings
 from database.connection import get_db_session
+from services.cache import cache_get, cache_set
 from database.models import User, Plant, Session, Message, Diagnosis, Reminder
 
 logger = logging.getLogger(__name__)
 
+# telegram_id -> users.id never changes once the user exists, so the
+# mapping is cached for hours
+_USER_ID_CACHE_TTL = 6 * 3600
+
+# Plant history is re-read often ("my plants") and changes rarely. Nothing
+# here writes plants or diagnoses, so entries are never invalidated and the
+# TTL is the only bound on staleness: a new diagnosis shows up within 5 min
+_PLANT_HISTORY_CACHE_TTL = 300
+
+# Plant history rows fetched per round-trip when streaming the result
+_PLANT_HISTORY_YIELD_PER = 100
+
+# Sessions with at least this many messages are written with COPY on asyncpg
+_MESSAGE_COPY_MIN_ROWS = 200
+_MESSAGE_COPY_COLUMNS = ("session_id", "role", "content", "has_image", "image_url", "timestamp", "tokens_used")
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Treat naive datetimes as UTC so timestamptz columns store the right instant."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _user_cache_key(telegram_id: str) -> str:
+    """Redis key of the telegram_id -> users.id mapping."""
+    return f"user:id:{telegram_id}"
+
+
+def _plant_history_cache_key(telegram_id: str) -> str:
+    """Redis key of a user's serialized plant history."""
+    return f"plants:{telegram_id}"
+
+
+def _user_upsert(telegram_id: str):
+    """
+    Build the atomic get-or-create statement for a user.
+    
+    One round-trip whether or not the user exists; concurrent first messages
+    from the same user can no longer race on the insert. RETURNING gives the
+    id and ``inserted`` (xmax = 0 only for a freshly inserted row version).
+    """
+    stmt = pg_insert(User).values(telegram_id=telegram_id)
+    return stmt.on_conflict_do_update(
+        index_elements=[User.telegram_id],
+        set_={"telegram_id": stmt.excluded.telegram_id},
+    ).returning(User.id, literal_column("xmax = 0").label("inserted"))
+
+
+async def _resolve_user_id(db: AsyncSession, telegram_id: str, create: bool = False) -> Optional[int]:
+    """
+    Map a telegram ID to the users.id primary key.
+    
+    The mapping is served from Redis when cached, so most tool calls skip
+    the users lookup entirely.
+    
+    Args:
+        db: Database session
+        telegram_id: User identifier (telegram ID)
+        create: Create the user if it does not exist yet
+        
+    Returns:
+        User primary key, or None if the user does not exist and create is False
+    """
+    cache_key = _user_cache_key(telegram_id)
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return int(cached)
+    
+    if create:
+        row = (await db.execute(_user_upsert(telegram_id))).one()
+        user_pk = row.id
+        if row.inserted:
+            # Not cached until committed: a rollback would leave a dangling id
+            return user_pk
+    else:
+        user_pk = await db.scalar(select(User.id).where(User.telegram_id == telegram_id))
+        if user_pk is None:
+            return None
+    
+    await cache_set(cache_key, str(user_pk), _USER_ID_CACHE_TTL)
+    return user_pk
+
+
+def _message_row(session_id, msg_data: "MessageItem") -> Dict:
+    """
+    Build the messages column values for one session message.
+    
+    Args:
+        session_id: Session primary key (or a column expression yielding it)
+        msg_data: Message to store
+        
+    Returns:
+        Column values; "timestamp" is omitted when the message has none
+    """
+    row = {
+        "session_id": session_id,
+        "role": msg_data.role,
+        "content": msg_data.content,
+        "has_image": msg_data.has_image,
+        "image_url": msg_data.image_url,
+        "tokens_used": msg_data.tokens_used or 0,
+    }
+    # Without a timestamp the server default (now()) fills it in;
+    # bulk INSERT batches rows by key set, so omitting it is safe
+    if msg_data.timestamp is not None:
+        row["timestamp"] = _as_utc(msg_data.timestamp)
+    return row
+
+
+async def _append_session_message(db: AsyncSession, session_data: "SessionData") -> bool:
+    """
+    Update an existing session and insert its single message in one statement.
+    
+    WITH upd AS (UPDATE sessions SET ... WHERE id = :sid RETURNING id)
+    INSERT INTO messages (...) SELECT upd.id, ... FROM upd
+    
+    Args:
+        db: Database session
+        session_data: Session data with exactly one message
+        
+    Returns:
+        False if the session does not exist yet (nothing is written then)
+    """
+    session_cte = (
+        update(Session)
+        .where(Session.id == int(session_data.session_id))
+        .values(
+            messages_count=len(session_data.messages),
+            tokens_used=session_data.tokens_used,
+            end_time=datetime.now(timezone.utc),
+        )
+        .returning(Session.id)
+        .cte("upd")
+    )
+    row = _message_row(session_cte.c.id, session_data.messages[0])
+    columns = Message.__table__.c
+    values = select(*(
+        value if name == "session_id" else literal(value, columns[name].type)
+        for name, value in row.items()
+    ))
+    stmt = (
+        insert(Message)
+        .from_select(list(row), values)
+        .add_cte(session_cte)  # data-modifying CTEs must be top level
+        .returning(Message.id)
+    )
+    return await db.scalar(stmt) is not None
+
+
+async def _insert_messages(db: AsyncSession, rows: List[Dict]) -> None:
+    """
+    Insert message rows, using COPY for large batches on asyncpg.
+    
+    Args:
+        db: Database session
+        rows: Message column values; rows without "timestamp" use now()
+    """
+    conn = await db.connection()
+    if len(rows) < _MESSAGE_COPY_MIN_ROWS or conn.dialect.driver != "asyncpg":
+        # The pending session is autoflushed first, so the FK holds
+        await db.execute(insert(Message), rows)
+        return
+    
+    # COPY goes straight to the driver: flush the session row first, and fill
+    # missing timestamps here because COPY applies defaults per column, not per row
+    await db.flush()
+    now = datetime.now(timezone.utc)
+    records = [
+        tuple(row.get(column, now) for column in _MESSAGE_COPY_COLUMNS)
+        for row in rows
+    ]
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        Message.__tablename__,
+        records=records,
+        columns=_MESSAGE_COPY_COLUMNS,
+    )
+
 
 class MessageItem(BaseModel):
-    model_config = ConfigDict(extra="forbid")  # строго
-    role: str = Field(description="Role of the message sender (user or assistant)")
+    model_config = ConfigDict(frozen=True, extra="forbid")  # строго
+    role: Literal["user", "assistant", "system"] = Field(description="Role of the message sender (user or assistant)")
     content: str = Field(description="Message content")
     has_image: bool = Field(default=False)
     image_url: Optional[str] = None
     timestamp: Optional[datetime] = None
     tokens_used: Optional[int] = None
 
+    @field_validator("role", mode="before")
+    @classmethod
+    def normalize_role(cls, v):
+        """Match the values allowed by ck_message_role."""
+        return v.strip().lower() if isinstance(v, str) else v
+
 
 class SessionData(BaseModel):
     """User session data."""
-    model_config = ConfigDict(extra="forbid")  # 💥 обязательный параметр
+    model_config = ConfigDict(frozen=True, extra="forbid")  # agent-supplied tool input
     session_id: str = Field(description="Unique session identifier")
     user_id: str = Field(description="User identifier")
     start_time: datetime = Field(description="Session start timestamp")
@@ -40,7 +226,7 @@ class SessionData(BaseModel):
 
 class PlantRecord(BaseModel):
     """User's plant record."""
-    model_config = ConfigDict(extra="forbid")  # 💥 обязательный параметр
+    model_config = ConfigDict(frozen=True, extra="ignore")  # tool output, built from DB rows
     plant_id: str = Field(description="Unique plant identifier")
     species: str = Field(description="Plant species name")
     nickname: Optional[str] = Field(description="User's nickname for plant")
@@ -51,9 +237,13 @@ class PlantRecord(BaseModel):
     care_notes: Optional[str] = Field(description="Care notes")
 
 
+# Cached plant history is (de)serialized in one pass over the whole list
+_PLANT_RECORDS_ADAPTER: Final[TypeAdapter] = TypeAdapter(List[PlantRecord])
+
+
 class ReminderInfo(BaseModel):
     """Reminder information."""
-    model_config = ConfigDict(extra="forbid")  # 💥 обязательный параметр
+    model_config = ConfigDict(frozen=True, extra="ignore")  # tool output
     reminder_id: str = Field(description="Unique reminder ID")
     reminder_type: str = Field(description="Type of reminder")
     scheduled_time: datetime = Field(description="When reminder is scheduled")
@@ -72,23 +262,22 @@ async def save_user_session(user_id: str, session_data: SessionData) -> None:
     """
     try:
         async with get_db_session() as db:
+            # Most calls append a single message to an existing session
+            if len(session_data.messages) == 1 and await _append_session_message(db, session_data):
+                await db.commit()
+                logger.info("Saved session %s for user %s", session_data.session_id, user_id)
+                return
+            
             # Check if user exists, create if not
-            user = await db.get(User, user_id)
-            if not user:
-                user = User(
-                    telegram_id=user_id,
-                    created_at=datetime.utcnow()
-                )
-                db.add(user)
-                await db.flush()
+            user_pk = await _resolve_user_id(db, user_id, create=True)
             
             # Create or update session
             session = await db.get(Session, session_data.session_id)
             if not session:
                 session = Session(
                     id=session_data.session_id,
-                    user_id=user.id,
-                    start_time=session_data.start_time,
+                    user_id=user_pk,
+                    start_time=_as_utc(session_data.start_time),
                     messages_count=len(session_data.messages),
                     tokens_used=session_data.tokens_used
                 )
@@ -96,26 +285,18 @@ async def save_user_session(user_id: str, session_data: SessionData) -> None:
             else:
                 session.messages_count = len(session_data.messages)
                 session.tokens_used = session_data.tokens_used
-                session.end_time = datetime.utcnow()
+                session.end_time = datetime.now(timezone.utc)
             
-            # Save messages
-            for msg_data in session_data.messages:
-                message = Message(
-                    session_id=session.id,
-                    role=msg_data.get("role", "user"),
-                    content=msg_data.get("content", ""),
-                    has_image=msg_data.get("has_image", False),
-                    image_url=msg_data.get("image_url"),
-                    timestamp=msg_data.get("timestamp", datetime.utcnow()),
-                    tokens_used=msg_data.get("tokens_used", 0)
-                )
-                db.add(message)
+            # Save messages in bulk instead of a unit-of-work object per message
+            rows = [_message_row(session.id, msg_data) for msg_data in session_data.messages]
+            if rows:
+                await _insert_messages(db, rows)
             
             await db.commit()
-            logger.info(f"Saved session {session_data.session_id} for user {user_id}")
+            logger.info("Saved session %s for user %s", session_data.session_id, user_id)
             
     except Exception as e:
-        logger.error(f"Error saving user session: {str(e)}", exc_info=True)
+        logger.error("Error saving user session: %s", e, exc_info=True)
         raise
 
 
@@ -131,50 +312,54 @@ async def get_user_plant_history(user_id: str) -> List[PlantRecord]:
         List of plant records with their latest health status
     """
     try:
+        cache_key = _plant_history_cache_key(user_id)
+        cached = await cache_get(cache_key)
+        if cached is not None:
+            return _PLANT_RECORDS_ADAPTER.validate_json(cached)
+        
         async with get_db_session() as db:
             # Get user
-            stmt = select(User).where(User.telegram_id == user_id)
-            result = await db.execute(stmt)
-            user = result.scalar_one_or_none()
+            user_pk = await _resolve_user_id(db, user_id)
             
-            if not user:
-                logger.info(f"No user found with telegram_id {user_id}")
+            if user_pk is None:
+                logger.info("No user found with telegram_id %s", user_id)
                 return []
             
-            # Get user's plants
-            stmt = select(Plant).where(Plant.user_id == user.id)
-            result = await db.execute(stmt)
-            plants = result.scalars().all()
+            # Latest diagnosis of every plant of the user (DISTINCT ON keeps
+            # the first row per plant_id in created_at DESC order)
+            latest = (
+                select(Diagnosis.plant_id, Diagnosis.created_at, Diagnosis.health_score)
+                .where(Diagnosis.plant_id.in_(select(Plant.id).where(Plant.user_id == user_pk)))
+                .order_by(Diagnosis.plant_id, desc(Diagnosis.created_at))
+                .ext(distinct_on(Diagnosis.plant_id))
+                .subquery("latest")
+            )
             
-            plant_records = []
-            for plant in plants:
-                # Get latest diagnosis for each plant
-                stmt = (
-                    select(Diagnosis)
-                    .where(Diagnosis.plant_id == plant.id)
-                    .order_by(desc(Diagnosis.created_at))
-                    .limit(1)
+            # Plants joined with their latest diagnosis; the record fields are
+            # computed in SQL so rows map straight onto PlantRecord
+            stmt = (
+                select(
+                    cast(Plant.id, String).label("plant_id"),
+                    func.coalesce(func.nullif(Plant.species, ""), Plant.name).label("species"),
+                    Plant.nickname,
+                    Plant.added_at.label("added_date"),
+                    latest.c.created_at.label("last_diagnosis"),
+                    func.coalesce(latest.c.health_score, Plant.health_score).label("health_score"),
+                    Plant.location,
+                    Plant.notes.label("care_notes"),
                 )
-                result = await db.execute(stmt)
-                latest_diagnosis = result.scalar_one_or_none()
-                
-                record = PlantRecord(
-                    plant_id=str(plant.id),
-                    species=plant.species or plant.name,
-                    nickname=plant.nickname,
-                    added_date=plant.added_at,
-                    last_diagnosis=latest_diagnosis.created_at if latest_diagnosis else None,
-                    health_score=latest_diagnosis.health_score if latest_diagnosis else plant.health_score,
-                    location=plant.location,
-                    care_notes=plant.notes
-                )
-                plant_records.append(record)
-            
-            logger.info(f"Retrieved {len(plant_records)} plants for user {user_id}")
+                .outerjoin(latest, latest.c.plant_id == Plant.id)
+                .where(Plant.user_id == user_pk)
+            )
+            # Rows are streamed in batches and validated as they arrive
+            result = await db.stream(stmt.execution_options(yield_per=_PLANT_HISTORY_YIELD_PER))
+            plant_records = [PlantRecord.model_validate(row, from_attributes=True) async for row in result]
+            await cache_set(cache_key, _PLANT_RECORDS_ADAPTER.dump_json(plant_records).decode(), _PLANT_HISTORY_CACHE_TTL)
+            logger.info("Retrieved %s plants for user %s", len(plant_records), user_id)
             return plant_records
             
     except Exception as e:
-        logger.error(f"Error retrieving plant history: {str(e)}", exc_info=True)
+        logger.error("Error retrieving plant history: %s", e, exc_info=True)
         return []
 
 
@@ -201,45 +386,55 @@ async def schedule_reminder(
     """
     try:
         async with get_db_session() as db:
-            # Get user
-            stmt = select(User).where(User.telegram_id == user_id)
-            result = await db.execute(stmt)
-            user = result.scalar_one_or_none()
+            cache_key = _user_cache_key(user_id)
+            cached = await cache_get(cache_key)
             
-            if not user:
-                # Create user if doesn't exist
-                user = User(
-                    telegram_id=user_id,
-                    created_at=datetime.datetime.now(datetime.UTC)
-                )
-                db.add(user)
-                await db.flush()
+            # Upsert the user (unless its id is cached), insert the reminder and
+            # read the plant name in a single statement:
+            # WITH u AS (INSERT users ... ON CONFLICT ... RETURNING id),
+            #      r AS (INSERT reminders ... RETURNING id, plant_id)
+            # SELECT r.id, plants.nickname, plants.name, u.id
+            # FROM r LEFT JOIN plants ON plants.id = r.plant_id, u
+            user_cte = None
+            if cached is not None:
+                user_value = int(cached)
+            else:
+                user_cte = _user_upsert(user_id).cte("u")
+                user_value = select(user_cte.c.id).scalar_subquery()
             
-            # Create reminder
-            reminder = Reminder(
-                user_id=user.id,
-                plant_id=int(plant_id) if plant_id else None,
-                type=reminder_type,
-                title=f"{reminder_type.capitalize()} reminder",
-                description=description or f"Time to {reminder_type} your plant!",
-                scheduled_at=scheduled_time,
-                status="pending",
-                created_at=datetime.datetime.now(datetime.UTC)
+            reminder_cte = (
+                insert(Reminder)
+                .values(
+                    user_id=user_value,
+                    plant_id=int(plant_id) if plant_id else None,
+                    type=reminder_type,
+                    title=f"{reminder_type.capitalize()} reminder",
+                    description=description or f"Time to {reminder_type} your plant!",
+                    scheduled_at=_as_utc(scheduled_time),
+                    status="pending",
+                )
+                .returning(Reminder.id, Reminder.plant_id)
+                .cte("r")
+            )
+            stmt = select(reminder_cte.c.id, Plant.nickname, Plant.name).select_from(
+                reminder_cte.outerjoin(Plant, Plant.id == reminder_cte.c.plant_id)
             )
-            db.add(reminder)
+            if user_cte is not None:
+                stmt = stmt.add_columns(user_cte.c.id.label("user_pk"))
+            
+            row = (await db.execute(stmt)).one()
             await db.commit()
             
-            # Get plant name if plant_id provided
-            plant_name = None
-            if plant_id:
-                plant = await db.get(Plant, int(plant_id))
-                if plant:
-                    plant_name = plant.nickname or plant.name
+            # Committed now, so even a just-created user id is safe to cache
+            if user_cte is not None:
+                await cache_set(cache_key, str(row.user_pk), _USER_ID_CACHE_TTL)
+            
+            plant_name = (row.nickname or row.name) if plant_id else None
             
-            logger.info(f"Scheduled {reminder_type} reminder for user {user_id} at {scheduled_time}")
+            logger.info("Scheduled %s reminder for user %s at %s", reminder_type, user_id, scheduled_time)
             
             return ReminderInfo(
-                reminder_id=str(reminder.id),
+                reminder_id=str(row.id),
                 reminder_type=reminder_type,
                 scheduled_time=scheduled_time,
                 plant_name=plant_name,
@@ -247,7 +442,7 @@ async def schedule_reminder(
             )
             
     except Exception as e:
-        logger.error(f"Error scheduling reminder: {str(e)}", exc_info=True)
+        logger.error("Error scheduling reminder: %s", e, exc_info=True)
         # Return a basic reminder info even on error
         return ReminderInfo(
             reminder_id="error",
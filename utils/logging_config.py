@@ -1,13 +1,17 @@
 """Logging configuration."""
 
+import atexit
+import copy
 import logging
 import logging.config
 import json
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
-from config.settings import settings
+from config.settings import get_settings
 
 
 class JSONFormatter(logging.Formatter):
@@ -40,6 +44,79 @@ class JSONFormatter(logging.Formatter):
         return json.dumps(log_data)
 
 
+class LocalQueueHandler(QueueHandler):
+    """Queue handler feeding a listener thread in the same process."""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Render the message now but keep exc_info for the real formatters."""
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+class RoutingQueueListener(QueueListener):
+    """
+    Single listener thread writing each record to its logger's handlers.
+    
+    Every configured logger shares one queue, so the handlers a record goes
+    to are looked up by the logger that emitted it: the nearest configured
+    ancestor of record.name, or the root logger.
+    """
+    
+    def __init__(self, log_queue: queue.SimpleQueue, routes: Dict[str, Tuple[logging.Handler, ...]]):
+        unique: List[logging.Handler] = []
+        for handlers in routes.values():
+            unique.extend(h for h in handlers if h not in unique)
+        super().__init__(log_queue, *unique, respect_handler_level=True)
+        self.routes = routes
+    
+    def handle(self, record: logging.LogRecord) -> None:
+        """Pass the record to the handlers of the logger it came from."""
+        record = self.prepare(record)
+        name = record.name
+        while name and name not in self.routes:
+            name = name.rpartition(".")[0]
+        for handler in self.routes.get(name, self.routes[""]):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+# The running listener; replaced (after draining) when logging is reconfigured
+_LISTENER: Optional[RoutingQueueListener] = None
+
+
+def _stop_listener() -> None:
+    """Stop the listener, flushing the records still queued."""
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
+
+
+atexit.register(_stop_listener)
+
+
+def _enqueue_handlers(logger_names: List[str]) -> None:
+    """
+    Move the configured loggers' handlers behind one queue and listener thread.
+    
+    Args:
+        logger_names: Configured logger names, "" for the root logger
+    """
+    global _LISTENER
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = LocalQueueHandler(log_queue)
+    routes = {}
+    for name in logger_names:
+        logger = logging.getLogger(name or None)
+        routes[name] = tuple(logger.handlers)
+        logger.handlers = [queue_handler]
+    _LISTENER = RoutingQueueListener(log_queue, routes)
+    _LISTENER.start()
+
+
 def setup_logging(level: str = "INFO") -> None:
     """
     Setup logging configuration.
@@ -68,7 +145,7 @@ def setup_logging(level: str = "INFO") -> None:
             "console": {
                 "class": "logging.StreamHandler",
                 "level": level,
-                "formatter": "standard" if settings.DEBUG else "json",
+                "formatter": "standard" if get_settings().DEBUG else "json",
                 "stream": "ext://sys.stdout",
             },
             "file": {
@@ -118,13 +195,20 @@ def setup_logging(level: str = "INFO") -> None:
         },
     }
     
+    # Drain the previous listener before dictConfig closes its handlers
+    _stop_listener()
+    
     # Apply configuration
     logging.config.dictConfig(config)
     
+    # Console and file writes happen on the listener thread, so log calls
+    # from the event loop only enqueue the record
+    _enqueue_handlers(["", *config["loggers"]])
+    
     # Log startup
     logger = logging.getLogger(__name__)
-    logger.info(f"Logging configured with level: {level}")
-    logger.info(f"Log files stored in: {log_dir.absolute()}")
+    logger.info("Logging configured with level: %s", level)
+    logger.info("Log files stored in: %s", log_dir.absolute())
 
 
 def get_logger(name: str) -> logging.Logger:
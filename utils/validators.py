@@ -3,7 +3,7 @@
 import re
 from typing import Optional, Tuple
 
-from config.settings import settings
+from config.settings import get_settings
 
 
 class Validators:
@@ -58,8 +58,9 @@ class Validators:
         if image_size <= 0:
             return False, "Invalid image size"
         
-        if image_size > settings.MAX_IMAGE_SIZE:
-            max_mb = settings.MAX_IMAGE_SIZE / (1024 * 1024)
+        max_size = get_settings().MAX_IMAGE_SIZE
+        if image_size > max_size:
+            max_mb = max_size / (1024 * 1024)
             return False, f"Image too large (max {max_mb}MB)"
         
         return True, None